@@ -1,4 +1,6 @@
-from pydantic import BaseModel, PostgresDsn
+from typing import Literal
+
+from pydantic import BaseModel, Field, PostgresDsn
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -12,6 +14,15 @@ class PostgresSchema(BaseModel):
     pool_size: int = 5
     max_overflow: int = 10
     pool_timeout: int = 30
+    # Подключение через PgBouncer (transaction pooling): без кеша подготовленных операторов
+    pgbouncer: bool = False
+    # Размер кеша подготовленных операторов на соединение (при pgbouncer=false)
+    statement_cache_size: int = 500
+    # DSN реплик для read-only запросов (postgresql+asyncpg://...); пусто — всё читается с primary
+    replica_dsns: list[str] = []
+    # Как часто и с каким таймаутом проверяется доступность реплик, секунды
+    replica_check_interval: float = 5.0
+    replica_check_timeout: float = 2.0
 
     @property
     def url(self) -> str:
@@ -34,11 +45,130 @@ class MinioSchema(BaseModel):
     docs_bucket: str
     container_endpoint: str
     outside_endpoint: str
+    region: str = "us-east-1"
+    # Какую ссылку link_to_download получает клиент:
+    # public — на публичный bucket (на bucket ставится политика публичного чтения),
+    # presigned — временную подписанную ссылку, proxy — на /docs/download сервиса
+    download_mode: Literal["public", "presigned", "proxy"] = "public"
+    # /docs/download отвечает 307 на ссылку MinIO (public/presigned) вместо потоковой отдачи
+    redirect_downloads: bool = False
+    # Время жизни подписанной ссылки, секунды
+    presigned_url_ttl: int = 300
+    # Пул соединений к MinIO, общий для всех запросов процесса
+    pool_size: int = 100
+    keepalive_timeout: float = 30.0
+    connect_timeout: float = 5.0
+    read_timeout: float = 60.0
+    # Попытки для идемпотентных операций (повторы с экспоненциальной задержкой и джиттером)
+    retry_attempts: int = 3
+
+
+class VerificationCacheSchema(BaseModel):
+    max_size: int = 10_000
+    # Подписанный документ не может стать неподписанным, поэтому положительный ответ живёт долго
+    ttl: int = 3600
+    negative_ttl: int = 60
+
+
+class BatchVerificationSchema(BaseModel):
+    # Максимум файлов или хешей в одном запросе /verify/batch
+    max_items: int = 1000
+    # Сколько загруженных файлов хешируется одновременно
+    hash_concurrency: int = 8
+
+
+class BloomFilterSchema(BaseModel):
+    enabled: bool = True
+    false_positive_rate: float = Field(0.001, gt=0, lt=1)
+    # Ёмкость фильтра: число подписанных документов на момент сборки * growth_factor, но не меньше min_capacity
+    min_capacity: int = 100_000
+    growth_factor: float = Field(2.0, ge=1)
+    # Периодическая полная пересборка, секунды (также выполняется при переполнении фильтра)
+    rebuild_interval: int = 3600
+
+
+class ServerSchema(BaseModel):
+    # Запуск через gunicorn с несколькими воркерами uvicorn (scripts/startup.sh)
+    multiprocess: bool = False
+    # Число воркеров; по умолчанию — по квоте CPU контейнера
+    workers: int | None = None
+    # Воркер плавно перезапускается после max_requests (+ случайно до max_requests_jitter) запросов
+    max_requests: int = 10000
+    max_requests_jitter: int = 1000
+    # Сколько секунд воркер дозавершает запросы при перезапуске и остановке
+    graceful_timeout: int = 30
+    # Воркер, не отвечающий мастеру столько секунд, перезапускается
+    timeout: int = 60
+    keepalive: int = 5
+    # Сколько секунд /metrics отдаёт ранее собранный ответ
+    metrics_cache_ttl: float = 1.0
+
+
+class PdfEngineSchema(BaseModel):
+    # Число процессов рендера; по умолчанию — доступные CPU, поделённые между воркерами сервера
+    workers: int | None = None
+    # Сколько задач может ждать свободный процесс, сверх этого /generate отвечает 503
+    max_queue: int = 64
+    # Значение Retry-After для ответа 503, секунды
+    retry_after: int = 1
+    # Фиксированные метаданные PDF: одинаковые данные дают побайтно одинаковый документ
+    deterministic: bool = False
+
+
+class GenerationJobsSchema(BaseModel):
+    enabled: bool = True
+    # Сколько элементов заданий процесс генерирует одновременно
+    concurrency: int = 4
+    # Максимум документов в одном POST /docs/generate/batch
+    max_items: int = 50000
+    # Как часто воркер без дела проверяет очередь, секунды
+    poll_interval: float = 2.0
+    # Через сколько секунд элемент в processing считается брошенным и забирается повторно
+    stale_after: float = 300
+    max_attempts: int = 3
+
+
+class InsertBatchingSchema(BaseModel):
+    # Групповая вставка документов /generate: одна транзакция на пакет вместо транзакции на запрос
+    enabled: bool = False
+    # Пакет отправляется при накоплении max_rows строк или через max_delay_ms после первой
+    max_rows: int = 100
+    max_delay_ms: float = 5.0
+
+
+class UploadsSchema(BaseModel):
+    # Максимальный размер multipart-запроса, байты
+    max_size: int = 50 * 1024 * 1024
+    # Сколько байт каждого файла держится в памяти, прежде чем он уходит во временный файл
+    spool_max_size: int = 1024 * 1024
+    # Каталог временных файлов загрузок (например, tmpfs); по умолчанию — системный
+    spool_dir: str | None = None
+    # Сколько байт загрузок процесс принимает одновременно
+    inflight_budget: int = 512 * 1024 * 1024
+    # Сколько секунд запрос ждёт места в бюджете, прежде чем получить 503
+    budget_wait: float = 5.0
+    retry_after: int = 1
+
+
+class TracingSchema(BaseModel):
+    # Заголовок с correlation id: берётся из запроса (или генерируется) и возвращается в ответе
+    correlation_id_header: str = "X-Correlation-ID"
+    # Отдавать ли время этапов запроса в заголовке Server-Timing
+    server_timing: bool = False
 
 
 class Settings(BaseSettings):
     postgres: PostgresSchema
     minio: MinioSchema
+    verification_cache: VerificationCacheSchema = VerificationCacheSchema()
+    bloom_filter: BloomFilterSchema = BloomFilterSchema()
+    batch_verification: BatchVerificationSchema = BatchVerificationSchema()
+    server: ServerSchema = ServerSchema()
+    pdf_engine: PdfEngineSchema = PdfEngineSchema()
+    generation_jobs: GenerationJobsSchema = GenerationJobsSchema()
+    insert_batching: InsertBatchingSchema = InsertBatchingSchema()
+    uploads: UploadsSchema = UploadsSchema()
+    tracing: TracingSchema = TracingSchema()
 
     model_config = SettingsConfigDict(
         env_file="conf/.env",
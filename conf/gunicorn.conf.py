@@ -0,0 +1,28 @@
+# Конфигурация gunicorn для многопроцессного режима (SERVER__MULTIPROCESS=true, см. scripts/startup.sh)
+import os
+from typing import Any
+
+from prometheus_client import multiprocess
+
+from conf.config import settings
+from src.utils.cpu import web_workers
+
+bind = f"{os.environ.get('APP_HOST', '0.0.0.0')}:{os.environ.get('APP_PORT', '8001')}"
+worker_class = "uvicorn_worker.UvicornWorker"
+workers = web_workers(settings.server)
+
+# Приложение импортируется один раз в мастере, воркеры получают его через fork.
+# Соединения, пулы процессов и фоновые задачи создаются в lifespan уже в каждом воркере
+preload_app = True
+
+# Плавный перезапуск воркера после max_requests запросов; джиттер разносит перезапуски во времени
+max_requests = settings.server.max_requests
+max_requests_jitter = settings.server.max_requests_jitter
+graceful_timeout = settings.server.graceful_timeout
+timeout = settings.server.timeout
+keepalive = settings.server.keepalive
+
+
+def child_exit(server: Any, worker: Any) -> None:
+    # Убираем файлы live-гейджей завершившегося воркера, иначе его значения останутся в /metrics
+    multiprocess.mark_process_dead(worker.pid)  # type: ignore
@@ -0,0 +1,69 @@
+"""Docs binary digests
+
+Revision ID: e2d95c07f8a1
+Revises: b7f3a9c41e06
+Create Date: 2026-10-18 14:20:37.615482
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "e2d95c07f8a1"
+down_revision: Union[str, None] = "b7f3a9c41e06"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # hex VARCHAR(64) -> BYTEA(32); уникальные индексы перестраиваются вместе со сменой типа
+    op.alter_column(
+        "docs",
+        "original_document_hash",
+        type_=sa.LargeBinary(length=32),
+        existing_nullable=False,
+        postgresql_using="decode(original_document_hash, 'hex')",
+    )
+    op.alter_column(
+        "docs",
+        "signed_document_hash",
+        type_=sa.LargeBinary(length=32),
+        existing_nullable=True,
+        postgresql_using="decode(signed_document_hash, 'hex')",
+    )
+    op.create_check_constraint(
+        op.f("ck_docs_original_document_hash_length"), "docs", "octet_length(original_document_hash) = 32"
+    )
+    op.create_check_constraint(op.f("ck_docs_signed_document_hash_length"), "docs", "octet_length(signed_document_hash) = 32")
+    op.create_index("ix_docs_created_at_id", "docs", ["created_at", "id"], unique=False)
+    op.create_index(
+        "ix_docs_signed_created_at_id",
+        "docs",
+        ["created_at", "id"],
+        unique=False,
+        postgresql_where=sa.text("is_signed"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_docs_signed_created_at_id", table_name="docs", postgresql_where=sa.text("is_signed"))
+    op.drop_index("ix_docs_created_at_id", table_name="docs")
+    op.drop_constraint(op.f("ck_docs_signed_document_hash_length"), "docs", type_="check")
+    op.drop_constraint(op.f("ck_docs_original_document_hash_length"), "docs", type_="check")
+    op.alter_column(
+        "docs",
+        "signed_document_hash",
+        type_=sa.String(),
+        existing_nullable=True,
+        postgresql_using="encode(signed_document_hash, 'hex')",
+    )
+    op.alter_column(
+        "docs",
+        "original_document_hash",
+        type_=sa.String(),
+        existing_nullable=False,
+        postgresql_using="encode(original_document_hash, 'hex')",
+    )
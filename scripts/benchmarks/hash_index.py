@@ -0,0 +1,190 @@
+"""
+Бенчмарк хранения дайджестов: hex VARCHAR(64) против BYTEA(32).
+
+    python -m scripts.benchmarks.hash_index [rows]
+
+Создаёт во временной схеме две таблицы с одинаковыми SHA-256 (по умолчанию 1 000 000 строк),
+строит на них уникальные индексы и сравнивает размер таблицы/индекса и задержку точечного поиска.
+Затем там же создаёт таблицу docs по модели Document и через EXPLAIN generic-плана подготовленного
+оператора проверяет, что листинг подписанных документов использует частичный индекс.
+Нужен Postgres из настроек приложения (POSTGRES__*); данные приложения не затрагиваются.
+"""
+
+import asyncio
+import hashlib
+import os
+import statistics
+import sys
+import time
+from collections.abc import Callable, Iterator
+from typing import Any
+
+import orjson
+from sqlalchemy import Select, bindparam, select, text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from src.db.postgres import engine
+from src.models.document import Document
+from src.repositories.doc import LIST_ORDER, DocumentRepository
+from src.schema.info.doc import DocumentFilters
+
+SCHEMA = "bench_hash_index"
+LOOKUPS = 20_000
+INSERT_BATCH = 10_000
+# Доля подписанных документов в таблице листинга
+SIGNED_RATIO = 0.1
+SIGNED_LISTING_INDEX = "ix_docs_signed_created_at_id"
+
+VARIANTS: dict[str, tuple[str, Callable[[bytes], object]]] = {
+    "varchar_hex": ("VARCHAR", lambda digest: digest.hex()),
+    "bytea": ("BYTEA", lambda digest: digest),
+}
+
+
+async def fill(
+    connection: AsyncConnection,
+    table: str,
+    column_type: str,
+    digests: list[bytes],
+    convert: Callable[[bytes], object],
+) -> None:
+    await connection.execute(text(f"CREATE TABLE {SCHEMA}.{table} (id BIGSERIAL PRIMARY KEY, hash {column_type} NOT NULL)"))
+    for start in range(0, len(digests), INSERT_BATCH):
+        await connection.execute(
+            text(f"INSERT INTO {SCHEMA}.{table} (hash) VALUES (:hash)"),
+            [{"hash": convert(digest)} for digest in digests[start : start + INSERT_BATCH]],
+        )
+    await connection.execute(text(f"CREATE UNIQUE INDEX {table}_hash ON {SCHEMA}.{table} (hash)"))
+    await connection.execute(text(f"VACUUM ANALYZE {SCHEMA}.{table}"))
+
+
+async def sizes(connection: AsyncConnection, table: str) -> tuple[int, int]:
+    result = await connection.execute(
+        text("SELECT pg_relation_size(CAST(:table AS regclass)), pg_relation_size(CAST(:index AS regclass))"),
+        {"table": f"{SCHEMA}.{table}", "index": f"{SCHEMA}.{table}_hash"},
+    )
+    table_size, index_size = result.one()
+    return table_size, index_size
+
+
+async def lookups(connection: AsyncConnection, table: str, probes: list[object]) -> list[float]:
+    timings = []
+    stmt = text(f"SELECT id FROM {SCHEMA}.{table} WHERE hash = :hash")
+    for probe in probes:
+        start = time.perf_counter()
+        await connection.execute(stmt, {"hash": probe})
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+async def fill_docs(connection: AsyncConnection, rows: int) -> None:
+    # Таблица с индексами и ограничениями модели; search_path указывает на схему бенчмарка
+    await connection.run_sync(Document.metadata.tables[Document.__tablename__].create)
+    await connection.execute(
+        text(
+            """
+            INSERT INTO docs (original_document_hash, original_document_path, signed_document_hash,
+                              signed_document_path, is_signed, created_at, updated_at)
+            SELECT sha256(int8send(i)), 'bench', CASE WHEN signed THEN sha256(int8send(-i)) END,
+                   CASE WHEN signed THEN 'bench' END, signed, now() - i * interval '1 second', now()
+            FROM (SELECT i, random() < :ratio AS signed FROM generate_series(1, :rows) AS i) AS series
+            """
+        ),
+        {"rows": rows, "ratio": SIGNED_RATIO},
+    )
+    await connection.execute(text("VACUUM ANALYZE docs"))
+
+
+def _sql_literal(value: Any) -> str:
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(int(value))
+
+
+def _index_names(plan: dict[str, Any]) -> Iterator[str]:
+    if "Index Name" in plan:
+        yield plan["Index Name"]
+    for child in plan.get("Plans", []):
+        yield from _index_names(child)
+
+
+async def generic_plan_indexes(connection: AsyncConnection, name: str, stmt: Select[Any]) -> list[str]:
+    # PREPARE + EXECUTE при force_generic_plan — тот же план, что получит подготовленный оператор asyncpg
+    # после нескольких выполнений: значения параметров планировщику неизвестны
+    compiled = stmt.compile(dialect=connection.dialect)
+    parameters = ", ".join(_sql_literal(compiled.params[key]) for key in compiled.positiontup or ())
+    await connection.exec_driver_sql(f"PREPARE {name} AS {compiled}")
+    try:
+        execute = f"EXECUTE {name}({parameters})" if parameters else f"EXECUTE {name}"
+        result = await connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {execute}")
+        plan = result.scalar_one()
+        if isinstance(plan, str):
+            plan = orjson.loads(plan)
+        return list(_index_names(plan[0]["Plan"]))
+    finally:
+        await connection.exec_driver_sql(f"DEALLOCATE {name}")
+
+
+async def check_signed_listing(connection: AsyncConnection, rows: int) -> bool:
+    await connection.execute(text(f"SET search_path TO {SCHEMA}"))
+    try:
+        await fill_docs(connection, rows)
+        await connection.execute(text("SET plan_cache_mode TO force_generic_plan"))
+
+        listing = DocumentRepository._list_stmt(DocumentFilters(is_signed=True)).order_by(*LIST_ORDER)
+        variants: dict[str, Select[Any]] = {
+            "literal": listing.limit(Document.__page_size__),
+            # Прежняя форма фильтра для сравнения: is_signed = $1
+            "parameter": select(Document)
+            .where(Document.is_signed == bindparam("is_signed", True))
+            .order_by(*LIST_ORDER)
+            .limit(Document.__page_size__),
+        }
+        print(f"\nsigned listing, generic plan (rows={rows}, signed~{SIGNED_RATIO:.0%})")
+        uses_partial_index = {}
+        for variant, stmt in variants.items():
+            indexes = await generic_plan_indexes(connection, f"bench_listing_{variant}", stmt)
+            uses_partial_index[variant] = SIGNED_LISTING_INDEX in indexes
+            print(f"{variant:>12}: {', '.join(indexes) or 'seq scan'}")
+        return uses_partial_index["literal"]
+    finally:
+        await connection.execute(text("RESET plan_cache_mode"))
+        await connection.execute(text("RESET search_path"))
+
+
+async def main(rows: int) -> None:
+    digests = [hashlib.sha256(os.urandom(16)).digest() for _ in range(rows)]
+    # Половина — существующие хеши, половина — отсутствующие (как у /verify)
+    probe_digests = [digests[i] for i in range(0, rows, max(rows // (LOOKUPS // 2), 1))][: LOOKUPS // 2]
+    probe_digests += [hashlib.sha256(os.urandom(16)).digest() for _ in range(LOOKUPS // 2)]
+
+    # VACUUM нельзя выполнять внутри транзакции
+    async with engine.connect() as connection:
+        connection = await connection.execution_options(isolation_level="AUTOCOMMIT")
+        await connection.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        await connection.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+        try:
+            print(f"rows={rows}, lookups={len(probe_digests)}")
+            print(f"{'variant':>12} {'table MiB':>10} {'index MiB':>10} {'p50 us':>8} {'p99 us':>8}")
+            for table, (column_type, convert) in VARIANTS.items():
+                await fill(connection, table, column_type, digests, convert)
+                table_size, index_size = await sizes(connection, table)
+                probes = [convert(digest) for digest in probe_digests]
+                # Прогрев кеша буферов, затем замер
+                await lookups(connection, table, probes)
+                timings = sorted(await lookups(connection, table, probes))
+                p50 = statistics.median(timings) * 1e6
+                p99 = timings[int(len(timings) * 0.99)] * 1e6
+                print(f"{table:>12} {table_size / 2**20:>10.1f} {index_size / 2**20:>10.1f} {p50:>8.0f} {p99:>8.0f}")
+
+            if not await check_signed_listing(connection, rows):
+                print(f"листинг подписанных документов не использует {SIGNED_LISTING_INDEX}")
+                sys.exit(1)
+        finally:
+            await connection.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000))
@@ -0,0 +1,129 @@
+"""
+Микробенчмарк хеширования: обоснование констант src/utils/hashing.py.
+
+    python -m scripts.benchmarks.hashing
+
+1. Чанки: время SHA-256 файла при разных размерах чтения (4 КиБ — прежний calculate_sha256 на aiofiles).
+2. Порог выноса в поток: цена asyncio.to_thread против хеширования буфера на event loop.
+3. Задержка event loop: насколько «замирает» loop, пока параллельно хешируются крупные буферы.
+4. Несколько дайджестов за проход: sha256 против sha256 + blake2b.
+"""
+
+import asyncio
+import hashlib
+import os
+import statistics
+import tempfile
+import time
+from collections.abc import Awaitable, Callable
+
+import aiofiles
+
+from src.utils.hashing import MultiHasher, adaptive_chunk_size, hash_buffer, hash_bytes, hash_file
+
+FILE_SIZES = (256 * 1024, 4 * 1024 * 1024, 64 * 1024 * 1024)
+BUFFER_SIZES = (16 * 1024, 64 * 1024, 256 * 1024, 1024 * 1024, 4 * 1024 * 1024)
+REPEAT = 5
+
+
+async def best_of(call: Callable[[], Awaitable[object]], repeat: int = REPEAT) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await call()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+async def aiofiles_sha256(path: str, chunk_size: int) -> str:
+    hash_ = hashlib.sha256()
+    async with aiofiles.open(path, "rb") as f:
+        while chunk := await f.read(chunk_size):
+            hash_.update(chunk)
+    return hash_.hexdigest()
+
+
+async def bench_files() -> None:
+    print("\n1. SHA-256 файла, мс (best of 5)")
+    print(f"{'size':>10} {'aiofiles 4K':>12} {'aiofiles 64K':>13} {'aiofiles adaptive':>18} {'mmap+thread':>12}")
+    for size in FILE_SIZES:
+        with tempfile.NamedTemporaryFile() as tmp:
+            tmp.write(os.urandom(size))
+            tmp.flush()
+            row = [
+                await best_of(lambda: aiofiles_sha256(tmp.name, 4096)),
+                await best_of(lambda: aiofiles_sha256(tmp.name, 64 * 1024)),
+                await best_of(lambda: aiofiles_sha256(tmp.name, adaptive_chunk_size(size))),
+                await best_of(lambda: hash_file(tmp.name)),
+            ]
+        print(f"{size // 1024:>8}K " + " ".join(f"{t * 1000:>12.2f}" for t in row))
+
+
+async def bench_offload() -> None:
+    print("\n2. Хеширование буфера: на loop против asyncio.to_thread, мкс (best of 5)")
+    print(f"{'size':>10} {'inline':>10} {'to_thread':>10}")
+    for size in BUFFER_SIZES:
+        data = os.urandom(size)
+
+        async def inline() -> None:
+            hash_bytes(data)
+
+        async def offloaded() -> None:
+            await asyncio.to_thread(hash_bytes, data)
+
+        print(f"{size // 1024:>8}K {await best_of(inline) * 1e6:>10.0f} {await best_of(offloaded) * 1e6:>10.0f}")
+
+
+async def bench_loop_lag() -> None:
+    print("\n3. Задержка event loop при хешировании 16 x 4 МиБ, мс")
+    buffers = [os.urandom(4 * 1024 * 1024) for _ in range(16)]
+
+    async def measure(hashing: Callable[[], Awaitable[object]]) -> tuple[float, float]:
+        lags: list[float] = []
+        done = asyncio.Event()
+
+        async def ticker() -> None:
+            while not done.is_set():
+                start = time.perf_counter()
+                await asyncio.sleep(0.001)
+                lags.append(time.perf_counter() - start - 0.001)
+
+        task = asyncio.create_task(ticker())
+        await hashing()
+        done.set()
+        await task
+        return statistics.median(lags) * 1000, max(lags) * 1000
+
+    async def inline() -> None:
+        for buffer in buffers:
+            hash_bytes(buffer)
+            await asyncio.sleep(0)
+
+    async def offloaded() -> None:
+        await asyncio.gather(*(hash_buffer(buffer) for buffer in buffers))
+
+    for name, hashing in (("inline", inline), ("hash_buffer", offloaded)):
+        median, worst = await measure(hashing)
+        print(f"{name:>12}: median {median:.2f}, max {worst:.2f}")
+
+
+async def bench_multi_digest() -> None:
+    print("\n4. Несколько дайджестов за проход по 64 МиБ, мс (best of 5)")
+    data = memoryview(os.urandom(64 * 1024 * 1024))
+    for algorithms in (("sha256",), ("blake2b",), ("sha256", "blake2b")):
+
+        async def run(algorithms: tuple[str, ...] = algorithms) -> None:
+            MultiHasher(algorithms).update(data)
+
+        print(f"{' + '.join(algorithms):>18}: {await best_of(run) * 1000:.1f}")
+
+
+async def main() -> None:
+    await bench_files()
+    await bench_offload()
+    await bench_loop_lag()
+    await bench_multi_digest()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -14,4 +14,12 @@ echo "Start gateway service"
 
 # Необходимо для того что бы он запустился с pid 1
 # для адекватного завершения всех процессов при выходе
+if [ "$SERVER__MULTIPROCESS" = "true" ]; then
+  # Метрики воркеров собираются через файлы; файлы прошлого запуска удаляем до старта
+  export PROMETHEUS_MULTIPROC_DIR="${PROMETHEUS_MULTIPROC_DIR:-/tmp/prometheus-multiproc}"
+  rm -rf "$PROMETHEUS_MULTIPROC_DIR"
+  mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+  exec uv run gunicorn "src.main:create_app()" --config conf/gunicorn.conf.py
+fi
+
 exec uv run uvicorn src.main:create_app --host=$APP_HOST --port=$APP_PORT
@@ -1,43 +1,91 @@
 from typing import Annotated
 
-from fastapi import Depends, HTTPException, Query, UploadFile
-from fastapi.responses import StreamingResponse
+from fastapi import Depends, File, Form, Header, HTTPException, Path, Query, Response, UploadFile
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.api.v1.docs.router import docs_router
-from src.db.postgres import get_session
-from src.integrations.minio import download_document_from_minio
+from src.db.postgres import get_read_session, get_session, replica_router
+from src.db.replicas import CONSISTENCY_TOKEN_HEADER, consistency_token
+from src.integrations.minio import serve_document_download
 from src.schema.base import Page
 from src.schema.info.doc import (
+    DocumentBatchValidationResponse,
     DocumentCreatedResponse,
     DocumentCreateDTO,
     DocumentFilters,
     DocumentGetDTO,
+    DocumentHashValidationDTO,
     DocumentSignedResponse,
     DocumentValidationResponse,
+    Sha256Hex,
 )
+from src.schema.info.job import GenerationBatchCreateDTO, GenerationJobCreatedResponse
 from src.services.doc import DocumentService
+from src.services.job import GenerationJobService
+from src.utils.pdf_engine import PdfEngineOverloadedError
+
+# Подписанный хеш нельзя «отозвать», поэтому положительный ответ неизменяем и кешируется прокси/CDN
+VALID_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Отрицательный ответ может измениться после подписи
+INVALID_CACHE_CONTROL = "no-cache"
+
+
+async def set_consistency_token(response: Response, session: AsyncSession) -> None:
+    # Read-your-writes: с этим токеном чтение не попадёт на реплику, ещё не получившую запись
+    if replica_router.enabled:
+        response.headers[CONSISTENCY_TOKEN_HEADER] = await consistency_token(session)
 
 
 # Просмотреть все
 @docs_router.get("/list", response_model=Page[DocumentGetDTO])
 async def get_documents(
     query_filters: Annotated[DocumentFilters, Query()],
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_read_session),
 ) -> Page[DocumentGetDTO]:
-    return await DocumentService.get_all(query_filters, session)
+    try:
+        return await DocumentService.get_all(query_filters, session)
+    except ValueError as e:
+        # Например, повреждённый курсор
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 # Скачать файлик из minio
 @docs_router.get("/download/{filename}", summary="Скачать PDF-документ")
-async def download_document(filename: str) -> StreamingResponse:
-    return await download_document_from_minio(filename)
+async def download_document(
+    filename: str,
+    range_header: Annotated[str | None, Header(alias="Range")] = None,
+    if_range: Annotated[str | None, Header(alias="If-Range")] = None,
+) -> Response:
+    return await serve_document_download(filename, range_header, if_range)
 
 
 # Создание нового документа (пока что mock)
 @docs_router.post("/generate", response_model=DocumentCreatedResponse)
-async def generate_document(dto: DocumentCreateDTO, session: AsyncSession = Depends(get_session)) -> DocumentCreatedResponse:
-    return await DocumentService.create(dto, session)
+async def generate_document(
+    dto: DocumentCreateDTO, response: Response, session: AsyncSession = Depends(get_session)
+) -> DocumentCreatedResponse:
+    try:
+        result = await DocumentService.create(dto, session)
+    except PdfEngineOverloadedError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    await set_consistency_token(response, session)
+    return result
+
+
+# Пакетная генерация: документы создаются в фоне, прогресс — GET /jobs/{id}
+# (с X-Consistency-Token из ответа, иначе отстающая реплика может ответить 404)
+@docs_router.post("/generate/batch", response_model=GenerationJobCreatedResponse, status_code=202)
+async def generate_documents_batch(
+    dto: GenerationBatchCreateDTO,
+    response: Response,
+    session: AsyncSession = Depends(get_session),
+) -> GenerationJobCreatedResponse:
+    try:
+        result = await GenerationJobService.create(dto, session)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    await set_consistency_token(response, session)
+    return result
 
 
 # Подписывание документа
@@ -45,18 +93,55 @@ async def generate_document(dto: DocumentCreateDTO, session: AsyncSession = Depe
 async def sign_document(
     original_file: UploadFile,
     signed_file: UploadFile,
+    response: Response,
     session: AsyncSession = Depends(get_session),
 ) -> DocumentSignedResponse:
     try:
-        return await DocumentService.sign(original_file, signed_file, session)
+        result = await DocumentService.sign(original_file, signed_file, session)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    await set_consistency_token(response, session)
+    return result
 
 
 # Проверка документа
 @docs_router.post("/verify", response_model=DocumentValidationResponse)
-async def verify_document(file: UploadFile, session: AsyncSession = Depends(get_session)) -> DocumentValidationResponse:
+async def verify_document(file: UploadFile, session: AsyncSession = Depends(get_read_session)) -> DocumentValidationResponse:
     try:
         return await DocumentService.verify(file, session)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+
+
+# Проверка документа по известному SHA-256, без загрузки файла
+@docs_router.get("/verify/{sha256}", response_model=DocumentValidationResponse)
+async def verify_document_hash(
+    sha256: Annotated[Sha256Hex, Path()],
+    response: Response,
+    session: AsyncSession = Depends(get_read_session),
+) -> DocumentValidationResponse:
+    result = await DocumentService.verify_hash(sha256, session)
+    response.headers["Cache-Control"] = VALID_CACHE_CONTROL if result.valid else INVALID_CACHE_CONTROL
+    return result
+
+
+# То же, но хеш передаётся в JSON-теле
+@docs_router.post("/verify/hash", response_model=DocumentValidationResponse)
+async def verify_document_hash_body(
+    dto: DocumentHashValidationDTO,
+    session: AsyncSession = Depends(get_read_session),
+) -> DocumentValidationResponse:
+    return await DocumentService.verify_hash(dto.sha256, session)
+
+
+# Пакетная проверка: либо много файлов, либо список хешей (multipart-форма)
+@docs_router.post("/verify/batch", response_model=DocumentBatchValidationResponse)
+async def verify_documents_batch(
+    files: Annotated[list[UploadFile] | None, File()] = None,
+    hashes: Annotated[list[Sha256Hex] | None, Form()] = None,
+    session: AsyncSession = Depends(get_read_session),
+) -> DocumentBatchValidationResponse:
+    try:
+        return await DocumentService.verify_batch(session, files=files, hashes=hashes)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
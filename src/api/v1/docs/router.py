@@ -1,3 +1,6 @@
 from fastapi import APIRouter
 
-docs_router = APIRouter(prefix="/docs", tags=["docs"])
+from src.utils.uploads import SpoolingRoute
+
+# Формы с файлами разбираются с настройками спулинга settings.uploads
+docs_router = APIRouter(prefix="/docs", tags=["docs"], route_class=SpoolingRoute)
@@ -0,0 +1,23 @@
+from typing import Annotated
+
+from fastapi import Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.api.v1.jobs.router import jobs_router
+from src.db.postgres import get_read_session
+from src.schema.info.job import GenerationJobFilters, GenerationJobResponse
+from src.services.job import GenerationJobService
+
+
+# Прогресс и результаты задания пакетной генерации.
+# Читается с реплики: сразу после создания передайте X-Consistency-Token из ответа /docs/generate/batch
+@jobs_router.get("/{job_id}", response_model=GenerationJobResponse)
+async def get_generation_job(
+    job_id: int,
+    query_filters: Annotated[GenerationJobFilters, Query()],
+    session: AsyncSession = Depends(get_read_session),
+) -> GenerationJobResponse:
+    job = await GenerationJobService.get(job_id, query_filters, session)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Задание не найдено")
+    return job
@@ -0,0 +1,85 @@
+from time import perf_counter
+from typing import Any
+
+from sqlalchemy import event
+from sqlalchemy.engine import Connection, ExecutionContext
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, ConnectionPoolEntry, Pool
+from sqlalchemy.pool.base import PoolProxiedConnection
+
+from src.integrations.metrics.metrics import DB_POOL_CHECKOUT_WAIT, DB_POOL_CONNECTIONS, DB_QUERY_LATENCY
+
+# Тип запроса для метки: первое слово SQL. Текст запроса в метки не попадает — кардинальность
+_QUERY_TYPES = frozenset({"SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "EXPLAIN"})
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Пул, который замеряет ожидание соединения: время от запроса соединения до его выдачи
+    (включая открытие нового соединения, если пул ещё не заполнен).
+    Имя пула для метрик берётся из pool_logging_name движка.
+    """
+
+    def _do_get(self) -> ConnectionPoolEntry:
+        start_time = perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_CHECKOUT_WAIT.labels(pool=self.logging_name or "default").observe(perf_counter() - start_time)
+
+
+def _export_pool_state(pool: Pool, name: str, returning: int = 0) -> None:
+    if not isinstance(pool, AsyncAdaptedQueuePool):
+        return
+
+    DB_POOL_CONNECTIONS.labels(pool=name, state="size").set(pool.size())
+    DB_POOL_CONNECTIONS.labels(pool=name, state="in_use").set(pool.checkedout() - returning)
+    DB_POOL_CONNECTIONS.labels(pool=name, state="idle").set(pool.checkedin() + returning)
+    # overflow() отрицателен, пока пул не заполнен до pool_size
+    DB_POOL_CONNECTIONS.labels(pool=name, state="overflow").set(max(pool.overflow(), 0))
+
+
+def instrument_engine(engine: AsyncEngine, name: str) -> None:
+    """
+    Метрики пула (занятые, свободные и overflow-соединения) и латентность запросов по типу.
+    """
+    sync_engine = engine.sync_engine
+    query_latency = {query_type: DB_QUERY_LATENCY.labels(pool=name, query_type=query_type) for query_type in _QUERY_TYPES}
+    other_latency = DB_QUERY_LATENCY.labels(pool=name, query_type="OTHER")
+
+    @event.listens_for(sync_engine, "checkout")
+    def on_checkout(dbapi_connection: Any, record: ConnectionPoolEntry, proxy: PoolProxiedConnection) -> None:
+        _export_pool_state(sync_engine.pool, name)
+
+    @event.listens_for(sync_engine, "checkin")
+    def on_checkin(dbapi_connection: Any, record: ConnectionPoolEntry) -> None:
+        # Событие приходит до возврата соединения в очередь пула — учитываем его как уже свободное
+        _export_pool_state(sync_engine.pool, name, returning=1)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_execute(
+        conn: Connection,
+        cursor: Any,
+        statement: str,
+        parameters: Any,
+        context: ExecutionContext | None,
+        executemany: bool,
+    ) -> None:
+        conn.info["query_start_time"] = perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_execute(
+        conn: Connection,
+        cursor: Any,
+        statement: str,
+        parameters: Any,
+        context: ExecutionContext | None,
+        executemany: bool,
+    ) -> None:
+        start_time = conn.info.pop("query_start_time", None)
+        if start_time is None:
+            return
+
+        words = statement.split(None, 1)
+        query_type = words[0].upper() if words else ""
+        query_latency.get(query_type, other_latency).observe(perf_counter() - start_time)
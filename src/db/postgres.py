@@ -1,19 +1,49 @@
-from typing import AsyncGenerator
+from typing import Annotated, Any, AsyncGenerator
+from uuid import uuid4
 
-from sqlalchemy import AsyncAdaptedQueuePool
+from fastapi import Header
 from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 
-from conf.config import settings
+from conf.config import PostgresSchema, settings
+from src.db.instrumentation import InstrumentedQueuePool, instrument_engine
+from src.db.replicas import CONSISTENCY_TOKEN_HEADER, ReplicaRouter
 
+# Ключ Session.info: запрос пришёл с токеном согласованности и должен видеть свежие записи,
+# а не только то, что успело дойти до локальных кешей процесса
+BYPASS_PREFILTER = "bypass_prefilter"
 
-def create_engine() -> AsyncEngine:
-    return create_async_engine(
-        url=settings.postgres.url,
-        poolclass=AsyncAdaptedQueuePool,
-        connect_args={
+
+def _connect_args(config: PostgresSchema) -> dict[str, Any]:
+    if config.pgbouncer:
+        # PgBouncer в режиме transaction отдаёт каждую транзакцию случайному серверному соединению:
+        # подготовленные операторы там не переживают транзакцию, поэтому кеши выключены,
+        # а имена операторов уникальны, чтобы не столкнуться с чужими на том же сервере
+        return {
             "statement_cache_size": 0,
-        },
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+        }
+
+    # Прямое соединение с Postgres: повторяющиеся запросы не разбираются и не планируются заново
+    return {
+        "statement_cache_size": config.statement_cache_size,
+        "prepared_statement_cache_size": config.statement_cache_size,
+    }
+
+
+def create_engine(config: PostgresSchema = settings.postgres, name: str = "primary", url: str | None = None) -> AsyncEngine:
+    engine = create_async_engine(
+        url=url or config.url,
+        poolclass=InstrumentedQueuePool,
+        pool_size=config.pool_size,
+        max_overflow=config.max_overflow,
+        pool_timeout=config.pool_timeout,
+        pool_logging_name=name,
+        echo=config.debug,
+        connect_args=_connect_args(config),
     )
+    instrument_engine(engine, name)
+    return engine
 
 
 def create_session(engine: AsyncEngine | None = None) -> async_sessionmaker[AsyncSession]:
@@ -27,8 +57,25 @@ def create_session(engine: AsyncEngine | None = None) -> async_sessionmaker[Asyn
 
 engine = create_engine()
 async_session = create_session(engine)
+replica_router = ReplicaRouter(
+    [create_engine(name=f"replica-{i}", url=dsn) for i, dsn in enumerate(settings.postgres.replica_dsns)],
+    check_interval=settings.postgres.replica_check_interval,
+    check_timeout=settings.postgres.replica_check_timeout,
+)
 
 
 async def get_session() -> AsyncGenerator[AsyncSession, None]:
     async with async_session() as session:
         yield session
+
+
+async def get_read_session(
+    consistency_token: Annotated[str | None, Header(alias=CONSISTENCY_TOKEN_HEADER)] = None,
+) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Сессия для read-only обработчиков: реплика, если она здорова и догнала токен согласованности,
+    иначе primary. С токеном репозитории не доверяют фильтру Блума и отрицательному кешу.
+    """
+    replica = await replica_router.choose(consistency_token)
+    async with async_session(bind=replica or engine, info={BYPASS_PREFILTER: consistency_token is not None}) as session:
+        yield session
@@ -0,0 +1,114 @@
+import asyncio
+import re
+from itertools import cycle
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from src.integrations.logger import logger
+from src.integrations.metrics.metrics import DB_READ_ROUTING, DB_REPLICA_HEALTHY
+
+# Заголовок read-your-writes: LSN коммита записи, реплика должна его догнать
+CONSISTENCY_TOKEN_HEADER = "X-Consistency-Token"
+# Формат pg_lsn: два hex-числа через «/»
+_LSN = re.compile(r"^[0-9A-Fa-f]{1,8}/[0-9A-Fa-f]{1,8}$")
+
+
+async def consistency_token(session: AsyncSession) -> str:
+    """
+    LSN после коммита записи. Клиент передаёт его в CONSISTENCY_TOKEN_HEADER при следующем чтении.
+    """
+    result = await session.execute(text("SELECT pg_current_wal_lsn()::text"))
+    lsn: str = result.scalar_one()
+    return lsn
+
+
+class ReplicaRouter:
+    """
+    Выбирает реплику для read-only сессии: round-robin по здоровым репликам,
+    при отсутствии здоровых — primary. Здоровье проверяется фоновой задачей.
+    С токеном согласованности реплика используется, только если уже воспроизвела этот LSN.
+    """
+
+    def __init__(self, engines: list[AsyncEngine], check_interval: float, check_timeout: float) -> None:
+        self.engines = engines
+        self.check_interval = check_interval
+        self.check_timeout = check_timeout
+        # До первой проверки реплики считаются недоступными: читаем с primary
+        self._healthy: list[AsyncEngine] = []
+        self._round_robin = cycle(self._healthy)
+        self._task: asyncio.Task[None] | None = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.engines)
+
+    async def start(self) -> None:
+        if self.enabled:
+            await self.check()
+            self._task = asyncio.create_task(self._run(), name="replica-health-check")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        for engine in self.engines:
+            await engine.dispose()
+
+    async def _is_healthy(self, engine: AsyncEngine) -> bool:
+        try:
+            async with asyncio.timeout(self.check_timeout):
+                async with engine.connect() as connection:
+                    result = await connection.execute(text("SELECT pg_is_in_recovery()"))
+                    result.scalar_one()
+            return True
+        except Exception as e:
+            logger.warning(f"⚠️ Реплика {engine.pool.logging_name} недоступна: {e}")
+            return False
+
+    async def check(self) -> None:
+        statuses = await asyncio.gather(*(self._is_healthy(engine) for engine in self.engines))
+        healthy = [engine for engine, ok in zip(self.engines, statuses) if ok]
+        for engine, ok in zip(self.engines, statuses):
+            DB_REPLICA_HEALTHY.labels(pool=engine.pool.logging_name or "replica").set(1 if ok else 0)
+
+        if len(healthy) != len(self._healthy):
+            logger.info(f"🔁 Здоровых реплик: {len(healthy)} из {len(self.engines)}")
+        self._healthy = healthy
+        self._round_robin = cycle(healthy)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.check_interval)
+            try:
+                await self.check()
+            except Exception as e:
+                logger.error(f"❌ Ошибка проверки реплик: {e}")
+
+    async def _caught_up(self, engine: AsyncEngine, lsn: str) -> bool:
+        try:
+            async with engine.connect() as connection:
+                result = await connection.execute(
+                    text("SELECT pg_last_wal_replay_lsn() >= CAST(:lsn AS pg_lsn)"), {"lsn": lsn}
+                )
+                return bool(result.scalar_one())
+        except Exception as e:
+            logger.warning(f"⚠️ Не удалось проверить LSN реплики {engine.pool.logging_name}: {e}")
+            return False
+
+    async def choose(self, token: str | None = None) -> AsyncEngine | None:
+        """
+        Движок реплики или None — читать с primary.
+        """
+        if not self._healthy:
+            DB_READ_ROUTING.labels(target="primary", reason="no_replica").inc()
+            return None
+
+        engine = next(self._round_robin)
+        if token is not None and _LSN.match(token) and not await self._caught_up(engine, token):
+            DB_READ_ROUTING.labels(target="primary", reason="lagging").inc()
+            return None
+
+        DB_READ_ROUTING.labels(target="replica", reason="healthy").inc()
+        return engine
@@ -1,14 +1,23 @@
+import copy
 import logging
+import queue
+import random
+import sys
 from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+from typing import TextIO
 
+import orjson
 import yaml
 
+from src.integrations.metrics.metrics import LOG_RECORDS_DROPPED
+
 # Чтение конфигурации логирования
 with open("conf/logging.conf.yml", "r") as f:
     LOGGING_CONFIG = yaml.full_load(f)
 
-
-import json
+# Форматирует traceback в prepare, до передачи записи в фоновый поток
+_traceback_formatter = logging.Formatter()
 
 
 class ConsoleFormatter(logging.Formatter):
@@ -18,28 +27,115 @@ class ConsoleFormatter(logging.Formatter):
             "logger_name": record.name,
             "level": record.levelname,
             "message": record.getMessage(),
+            # correlation_id снимается в момент записи (см. BackgroundQueueHandler.prepare):
+            # форматирование может идти в другом потоке, где контекста запроса уже нет
+            "correlation_id": getattr(record, "correlation_id", correlation_id_ctx.get(None)),
         }
-        # Добавить correlation_id, если доступен
-        try:
-            log_record["correlation_id"] = correlation_id_ctx.get()
-        except LookupError:
-            log_record["correlation_id"] = None  # type: ignore
 
-        # Добавить информацию об ошибке, если она есть
-        if record.exc_info:
-            log_record["error"] = self.formatException(record.exc_info)
+        # Добавить информацию об ошибке, если она есть (из очереди traceback приходит уже строкой)
+        error = self.formatException(record.exc_info) if record.exc_info else getattr(record, "error", None)
+        if error:
+            log_record["error"] = error
+
+        return orjson.dumps(log_record).decode()
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Сэмплирование INFO/DEBUG по логгерам: rates задаёт долю пропускаемых записей
+    для логгера и всех его потомков (берётся самое длинное совпадающее имя).
+    WARNING и выше проходят всегда.
+    """
+
+    def __init__(self, rates: dict[str, float] | None = None) -> None:
+        super().__init__()
+        self.rates = rates or {}
+        self._resolved: dict[str, float] = {}
+
+    def _rate(self, name: str) -> float:
+        rate = self._resolved.get(name)
+        if rate is None:
+            rate = 1.0
+            candidate = name
+            while candidate:
+                if candidate in self.rates:
+                    rate = self.rates[candidate]
+                    break
+                candidate = candidate.rpartition(".")[0]
+            self._resolved[name] = rate
+        return rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.INFO:
+            return True
+
+        rate = self._rate(record.name)
+        if rate >= 1.0 or random.random() < rate:
+            return True
+
+        LOG_RECORDS_DROPPED.labels(reason="sampled").inc()
+        return False
+
+
+class BackgroundQueueHandler(QueueHandler):
+    """
+    Неблокирующий обработчик: запись кладётся в ограниченную очередь, а форматирование
+    и вывод в поток делает фоновый QueueListener. Если очередь заполнена (вывод не успевает),
+    новая запись отбрасывается и учитывается в метрике, но вызывающий код не ждёт.
+    """
+
+    def __init__(self, maxsize: int = 10_000, stream: TextIO | None = None) -> None:
+        super().__init__(queue.Queue(maxsize))
+        self.target = logging.StreamHandler(stream or sys.stderr)
+        self.listener = QueueListener(self.queue, self.target, respect_handler_level=True)
+        self.listener.start()
+        self._listening = True
+
+    def setFormatter(self, fmt: logging.Formatter | None) -> None:
+        # Форматирует только фоновый поток
+        self.target.setFormatter(fmt)
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Как в QueueHandler.prepare: работаем с копией (её же видят только наши обработчики),
+        # сообщение и traceback превращаем в строки, чтобы не держать аргументы и кадры стека
+        # до записи в фоновом потоке. JSON соберёт фоновый поток
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        record.correlation_id = correlation_id_ctx.get(None)
+        if record.exc_info or record.stack_info:
+            error = [_traceback_formatter.formatException(record.exc_info)] if record.exc_info else []
+            if record.stack_info:
+                error.append(_traceback_formatter.formatStack(record.stack_info))
+            record.error = "\n".join(error)
+        record.exc_info = None
+        record.exc_text = None
+        record.stack_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.labels(reason="queue_full").inc()
 
-        return json.dumps(log_record)
+    def close(self) -> None:
+        # Дописываем оставшиеся записи и останавливаем фоновый поток
+        if self._listening:
+            self._listening = False
+            self.listener.stop()
+        self.target.close()
+        super().close()
 
 
 # Контекст для correlation_id
-correlation_id_ctx: ContextVar[str] = ContextVar("correlation_id_ctx")
+correlation_id_ctx: ContextVar[str | None] = ContextVar("correlation_id_ctx", default=None)
 
 # Создание логгера
 logger = logging.getLogger("doc-verify")
 logger.setLevel(logging.INFO)
 
-# Обработчик для вывода в консоль
+# Обработчик для вывода в консоль до применения conf/logging.conf.yml (скрипты, миграции)
 console_handler = logging.StreamHandler()
 console_handler.setLevel(logging.DEBUG)
 
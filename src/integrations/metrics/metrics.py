@@ -1,6 +1,11 @@
 import os
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from threading import Lock
 from time import monotonic
-from typing import Any, Awaitable, Callable, Dict, List
+from typing import Awaitable, Callable, ParamSpec, TypeVar
 
 import prometheus_client
 from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, generate_latest
@@ -8,6 +13,11 @@ from prometheus_client.multiprocess import MultiProcessCollector
 from starlette.requests import Request
 from starlette.responses import Response
 
+from conf.config import settings
+
+P = ParamSpec("P")
+R = TypeVar("R")
+
 DEFAULT_BUCKETS = (
     0.005,
     0.01,
@@ -54,23 +64,256 @@ ROUTES_LATENCY = prometheus_client.Histogram(
     ["method", "endpoint"],
     buckets=DEFAULT_BUCKETS,
 )
+# histogram_quantile(0.99, sum(rate(routes_ttfb_seconds_bucket[1m])) by (le, endpoint))
+# время до начала ответа (статус и заголовки); для потоковых ответов заметно меньше routes_latency_seconds
+ROUTES_TTFB = prometheus_client.Histogram(
+    "routes_ttfb_seconds",
+    "Time to the start of the HTTP response",
+    ["method", "endpoint"],
+    buckets=DEFAULT_BUCKETS,
+)
+
+# sum(rate(cache_events_total{event="hit"}[5m])) by (cache) / sum(rate(cache_events_total{event=~"hit|miss"}[5m])) by (cache)
+# доля попаданий в кеш
+CACHE_EVENTS = prometheus_client.Counter(
+    "cache_events_total",
+    "In-process cache hits, misses and evictions",
+    ["cache", "event"],
+)
+
+# Состояние фильтров Блума: число элементов, ёмкость, размер в битах и занимаемая память
+BLOOM_FILTER_STATS = prometheus_client.Gauge(
+    "bloom_filter_stats",
+    "Bloom filter size and memory usage",
+    ["filter", "stat"],
+    multiprocess_mode="livemax",
+)
+
+# Сколько проверок фильтр отсёк без обращения к БД (absent) и сколько пропустил дальше (maybe)
+BLOOM_FILTER_CHECKS = prometheus_client.Counter(
+    "bloom_filter_checks_total",
+    "Bloom filter lookups by result",
+    ["filter", "result"],
+)
+
+# Генерация PDF в пуле процессов: задачи в работе и в очереди, время рендера, отказы из-за переполнения
+PDF_RENDER_IN_FLIGHT = prometheus_client.Gauge(
+    "pdf_render_in_flight",
+    "PDF render tasks by state",
+    ["state"],
+    multiprocess_mode="livesum",
+)
+PDF_RENDER_LATENCY = prometheus_client.Histogram(
+    "pdf_render_seconds",
+    "PDF render time inside a pool worker",
+    buckets=DEFAULT_BUCKETS,
+)
+PDF_RENDER_REJECTED = prometheus_client.Counter(
+    "pdf_render_rejected_total",
+    "PDF render requests rejected because the queue is full",
+)
+
+# Схлопывание одинаковых одновременных операций: leader выполняет работу, follower ждёт её результат
+SINGLE_FLIGHT_CALLS = prometheus_client.Counter(
+    "single_flight_calls_total",
+    "Single-flight calls by role",
+    ["group", "role"],
+)
+
+# Обработанные элементы заданий пакетной генерации: done, failed, retried, deferred
+GENERATION_JOB_ITEMS = prometheus_client.Counter(
+    "generation_job_items_total",
+    "Processed generation job items by result",
+    ["result"],
+)
+
+# Пул соединений Postgres: ожидание соединения, состояние пула, латентность запросов по типу
+DB_POOL_CHECKOUT_WAIT = prometheus_client.Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a connection from the pool",
+    ["pool"],
+    buckets=DEFAULT_BUCKETS,
+)
+DB_POOL_CONNECTIONS = prometheus_client.Gauge(
+    "db_pool_connections",
+    "Pool connections by state",
+    ["pool", "state"],
+    multiprocess_mode="livesum",
+)
+DB_QUERY_LATENCY = prometheus_client.Histogram(
+    "db_query_duration_seconds",
+    "Database query latency by statement type",
+    ["pool", "query_type"],
+    buckets=DEFAULT_BUCKETS,
+)
+
+# Маршрутизация чтения: доступность реплик и куда ушла read-only сессия
+DB_REPLICA_HEALTHY = prometheus_client.Gauge(
+    "db_replica_healthy",
+    "Replica health check result (1 healthy, 0 unavailable)",
+    ["pool"],
+    multiprocess_mode="livemin",
+)
+DB_READ_ROUTING = prometheus_client.Counter(
+    "db_read_routing_total",
+    "Read-only sessions by target and reason",
+    ["target", "reason"],
+)
+
+# Размер пакетов групповой записи (MicroBatcher)
+WRITE_BATCH_SIZE = prometheus_client.Histogram(
+    "write_batch_size",
+    "Number of rows flushed per write batch",
+    ["batcher"],
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500),
+)
+
+# Загрузки: занятый бюджет байт и отказы (too_large — превышен размер, budget — нет места в бюджете)
+UPLOAD_INFLIGHT_BYTES = prometheus_client.Gauge(
+    "upload_inflight_bytes",
+    "Bytes reserved by uploads currently being processed",
+    multiprocess_mode="livesum",
+)
+UPLOAD_REJECTED = prometheus_client.Counter(
+    "upload_rejected_total",
+    "Rejected uploads by reason",
+    ["reason"],
+)
+
+# Отброшенные записи логов: queue_full — переполнена очередь вывода, sampled — отсеяны сэмплированием
+LOG_RECORDS_DROPPED = prometheus_client.Counter(
+    "log_records_dropped_total",
+    "Log records dropped before output",
+    ["reason"],
+)
+
+# histogram_quantile(0.99, sum(rate(request_stage_latency_seconds_bucket[5m])) by (le, stage))
+# суммарное время этапа (хеширование, запросы к БД, MinIO, рендер PDF) за один запрос
+STAGE_LATENCY = prometheus_client.Histogram(
+    "request_stage_latency_seconds",
+    "Time spent in a stage per request",
+    ["stage"],
+    buckets=DEFAULT_BUCKETS,
+)
+
+
+class RequestStages:
+    """
+    Время по этапам одного запроса. Повторные вызовы этапа суммируются;
+    в гистограмму итог попадает один раз при завершении запроса.
+    """
+
+    __slots__ = ("durations",)
+
+    def __init__(self) -> None:
+        self.durations: dict[str, float] = {}
+
+    def add(self, stage: str, duration: float) -> None:
+        self.durations[stage] = self.durations.get(stage, 0.0) + duration
+
+    def observe(self) -> None:
+        for stage, duration in self.durations.items():
+            STAGE_LATENCY.labels(stage=stage).observe(duration)
+
+    def server_timing(self, total: float) -> str:
+        entries = [f"{stage};dur={duration * 1000:.1f}" for stage, duration in self.durations.items()]
+        entries.append(f"total;dur={total * 1000:.1f}")
+        return ", ".join(entries)
+
+
+# Этапы текущего HTTP-запроса (выставляет RequestContextMiddleware)
+request_stages_ctx: ContextVar[RequestStages | None] = ContextVar("request_stages_ctx", default=None)
+
+
+def record_stage(stage: str, duration: float) -> None:
+    stages = request_stages_ctx.get()
+    if stages is None:
+        # Вне запроса (фоновые задачи) пишем сразу в гистограмму
+        STAGE_LATENCY.labels(stage=stage).observe(duration)
+    else:
+        stages.add(stage, duration)
+
+
+@contextmanager
+def stage_timer(stage: str) -> Iterator[None]:
+    start_time = monotonic()
+    try:
+        yield
+    finally:
+        record_stage(stage, monotonic() - start_time)
 
 
-def async_integrations_timer(func: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
-    async def wrapper(*args: List[Any], **kwargs: Dict[Any, Any]) -> Awaitable[Any]:
+def async_stage_timer(func: Callable[P, Awaitable[R]]) -> Callable[P, Awaitable[R]]:
+    """
+    Учитывает вызов корутины как этап запроса с именем Class.method.
+    """
+    stage = func.__qualname__
+
+    @wraps(func)
+    async def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
         start_time: float = monotonic()
-        result = await func(*args, **kwargs)
-        INTEGRATIONS_LATENCY.labels(integration=func.__name__).observe(monotonic() - start_time)
-        return result  # type: ignore
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            record_stage(stage, monotonic() - start_time)
 
     return wrapper
 
 
+def async_integrations_timer(func: Callable[P, Awaitable[R]]) -> Callable[P, Awaitable[R]]:
+    stage = func.__qualname__
+
+    @wraps(func)
+    async def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+        start_time: float = monotonic()
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            duration = monotonic() - start_time
+            INTEGRATIONS_LATENCY.labels(integration=func.__name__).observe(duration)
+            record_stage(stage, duration)
+
+    return wrapper
+
+
+class _CachedExposition:
+    """
+    Ответ /metrics, собранный не чаще раза в ttl секунд. В многопроцессном режиме
+    сборка читает файлы всех воркеров, поэтому частые или параллельные опросы получают готовый результат.
+    """
+
+    def __init__(self, registry: CollectorRegistry, ttl: float) -> None:
+        self.registry = registry
+        self.ttl = ttl
+        self._lock = Lock()
+        self._payload = b""
+        self._expires_at = 0.0
+
+    def get(self) -> bytes:
+        # /metrics — синхронный эндпоинт и выполняется в пуле потоков
+        with self._lock:
+            now = monotonic()
+            if now >= self._expires_at:
+                self._payload = generate_latest(self.registry)
+                self._expires_at = now + self.ttl
+            return self._payload
+
+
+def _metrics_registry() -> CollectorRegistry:
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return REGISTRY
+
+    registry = CollectorRegistry()
+    MultiProcessCollector(registry)  # type: ignore
+    return registry
+
+
+_exposition: _CachedExposition | None = None
+
+
 def metrics(request: Request) -> Response:
-    if "prometheus_multiproc_dir" in os.environ:
-        registry = CollectorRegistry()
-        MultiProcessCollector(registry)  # type: ignore
-    else:
-        registry = REGISTRY
+    global _exposition
+    if _exposition is None:
+        _exposition = _CachedExposition(_metrics_registry(), settings.server.metrics_cache_ttl)
 
-    return Response(generate_latest(registry), headers={"Content-Type": CONTENT_TYPE_LATEST})
+    return Response(_exposition.get(), headers={"Content-Type": CONTENT_TYPE_LATEST})
@@ -1,24 +1,111 @@
+import re
 from time import monotonic
-from typing import Any, Awaitable, Callable
+from uuid import uuid4
 
-from starlette.requests import Request
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
-from src.integrations.metrics.metrics import ERROR_COUNT, REQUEST_COUNT, ROUTES_LATENCY
+from conf.config import TracingSchema
+from src.integrations.logger import correlation_id_ctx
+from src.integrations.metrics.metrics import (
+    ERROR_COUNT,
+    REQUEST_COUNT,
+    ROUTES_LATENCY,
+    ROUTES_TTFB,
+    RequestStages,
+    request_stages_ctx,
+)
 
+# Служебные пути не попадают в метрики
+_EXCLUDED_PATHS = frozenset({"/favicon.ico", "/metrics"})
+_UNMATCHED = "unmatched"
 
-async def prometheus_metrics(request: Request, call_next: Callable[..., Awaitable[Any]]) -> Awaitable[Any]:
-    method = request.method
-    path = request.url.path
+# Чужой correlation id принимаем только в безопасном для логов и заголовков виде
+_CORRELATION_ID_RE = re.compile(r"[A-Za-z0-9._\-]{1,128}")
 
-    start_time = monotonic()
-    response = await call_next(request)
-    process_time = monotonic() - start_time
-    if path in ["/favicon.ico", "/metrics"]:
-        return response  # type: ignore
-    REQUEST_COUNT.labels(method=method, endpoint=path, http_status=str(response.status_code)).inc()
-    ROUTES_LATENCY.labels(method=method, endpoint=path).observe(process_time)
 
-    if 400 <= response.status_code < 600:
-        ERROR_COUNT.labels(method=method, endpoint=path, http_status=str(response.status_code)).inc()
+class PrometheusMiddleware:
+    """
+    Метрики HTTP на чистом ASGI: без промежуточной задачи и буферизации потока ответа.
+    Эндпоинт в метках — шаблон сработавшего маршрута (/docs/download/{filename}),
+    запросы мимо маршрутов учитываются как "unmatched", чтобы не плодить временные ряды.
+    """
 
-    return response  # type: ignore
+    def __init__(self, app: ASGIApp, excluded_paths: frozenset[str] = _EXCLUDED_PATHS) -> None:
+        self.app = app
+        self.excluded_paths = excluded_paths
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] in self.excluded_paths:
+            await self.app(scope, receive, send)
+            return
+
+        start_time = monotonic()
+        status_code = 500
+        first_byte_at: float | None = None
+
+        async def send_with_metrics(message: Message) -> None:
+            nonlocal status_code, first_byte_at
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                first_byte_at = monotonic()
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            end_time = monotonic()
+            method = scope["method"]
+            # Маршрут выставляет роутер FastAPI в тот же scope при совпадении
+            route = scope.get("route")
+            endpoint = getattr(route, "path", _UNMATCHED)
+            http_status = str(status_code)
+
+            REQUEST_COUNT.labels(method=method, endpoint=endpoint, http_status=http_status).inc()
+            ROUTES_LATENCY.labels(method=method, endpoint=endpoint).observe(end_time - start_time)
+            if first_byte_at is not None:
+                ROUTES_TTFB.labels(method=method, endpoint=endpoint).observe(first_byte_at - start_time)
+            if 400 <= status_code < 600:
+                ERROR_COUNT.labels(method=method, endpoint=endpoint, http_status=http_status).inc()
+
+
+class RequestContextMiddleware:
+    """
+    Контекст запроса: correlation id (из заголовка или новый) для логов и ответа
+    и учёт времени этапов, которые отмечены stage_timer/async_stage_timer.
+    По завершении запроса этапы попадают в гистограмму, а при server_timing — ещё и в заголовок Server-Timing.
+    """
+
+    def __init__(self, app: ASGIApp, config: TracingSchema) -> None:
+        self.app = app
+        self.config = config
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        header = self.config.correlation_id_header
+        correlation_id = Headers(scope=scope).get(header, "")
+        if not _CORRELATION_ID_RE.fullmatch(correlation_id):
+            correlation_id = uuid4().hex
+
+        stages = RequestStages()
+        start_time = monotonic()
+
+        async def send_with_context(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append(header, correlation_id)
+                if self.config.server_timing:
+                    headers.append("Server-Timing", stages.server_timing(monotonic() - start_time))
+            await send(message)
+
+        correlation_token = correlation_id_ctx.set(correlation_id)
+        stages_token = request_stages_ctx.set(stages)
+        try:
+            await self.app(scope, receive, send_with_context)
+        finally:
+            request_stages_ctx.reset(stages_token)
+            correlation_id_ctx.reset(correlation_token)
+            stages.observe()
@@ -1,98 +1,324 @@
+import asyncio
 import json
+import re
+from collections.abc import AsyncIterator, Mapping
+from datetime import timedelta
 from io import BytesIO
 from uuid import uuid4
 
 import aiohttp
+from aiohttp_retry import JitterRetry, RetryClient
 from fastapi import HTTPException
-from fastapi.responses import StreamingResponse
+from fastapi.responses import RedirectResponse, Response, StreamingResponse
 from miniopy_async import Minio, S3Error
+from miniopy_async.datatypes import Object
+from miniopy_async.helpers import MIN_PART_SIZE
 
-from conf.config import settings
-from src.integrations.logger import logger
+from conf.config import MinioSchema, settings
+from src.integrations.logger import logger as app_logger
+from src.integrations.metrics.metrics import async_integrations_timer
+from src.utils.cache import TTLCache
+from src.utils.ingest import UploadStream
 
-minio_client = Minio(
-    endpoint=settings.minio.container_endpoint,
-    access_key=settings.minio.login,
-    secret_key=settings.minio.password,
-    secure=False,
+# Логгер горячих путей запросов: его INFO можно сэмплировать в conf/logging.conf.yml
+logger = app_logger.getChild("minio")
+
+# Повторяем только идемпотентные запросы: тело PUT — уже прочитанные байты части, его можно отправить заново
+_RETRY_METHODS = {"GET", "HEAD", "PUT", "DELETE"}
+_RETRY_STATUSES = {500, 502, 503, 504}
+
+
+class MinioStorage:
+    """
+    Клиент MinIO с общим пулом keep-alive соединений и повторами с джиттером.
+    Запускается и закрывается в lifespan приложения; bucket проверяется один раз.
+    """
+
+    def __init__(self, config: MinioSchema) -> None:
+        self.config = config
+        self.bucket = config.docs_bucket
+        self._connector: aiohttp.TCPConnector | None = None
+        self._timeout = aiohttp.ClientTimeout(total=None, connect=config.connect_timeout, sock_read=config.read_timeout)
+        self._retry_options = JitterRetry(
+            attempts=config.retry_attempts,
+            start_timeout=0.1,
+            max_timeout=2.0,
+            statuses=_RETRY_STATUSES,
+            exceptions={aiohttp.ClientConnectionError, asyncio.TimeoutError},
+            methods=_RETRY_METHODS,
+        )
+        self._bucket_ready = False
+        self._bucket_lock = asyncio.Lock()
+        # Регион задан явно, чтобы клиент не делал GetBucketLocation перед операциями
+        self.client = Minio(
+            endpoint=config.container_endpoint,
+            access_key=config.login,
+            secret_key=config.password,
+            secure=False,
+            region=config.region,
+            client_session=self.session,
+        )
+        # Подписанные ссылки должны указывать на внешний адрес MinIO: хост входит в подпись.
+        # Благодаря явному региону подпись считается локально, без запросов к MinIO
+        self.presign_client = Minio(
+            endpoint=config.outside_endpoint,
+            access_key=config.login,
+            secret_key=config.password,
+            secure=False,
+            region=config.region,
+        )
+
+    async def start(self) -> None:
+        try:
+            await self.ensure_bucket()
+        except Exception as e:
+            # Не валим старт: bucket будет проверен повторно при первой загрузке
+            logger.error(f"💥 Не удалось подготовить bucket MinIO при старте: {e}")
+
+    async def close(self) -> None:
+        if self._connector is not None:
+            await self._connector.close()
+            self._connector = None
+
+    def session(self) -> RetryClient:
+        """
+        Лёгкая сессия поверх общего пула: её закрытие не закрывает соединения пула.
+        """
+        if self._connector is None or self._connector.closed:
+            self._connector = aiohttp.TCPConnector(
+                limit=self.config.pool_size,
+                keepalive_timeout=self.config.keepalive_timeout,
+                ttl_dns_cache=300,
+            )
+        return RetryClient(
+            aiohttp.ClientSession(connector=self._connector, connector_owner=False, timeout=self._timeout),
+            retry_options=self._retry_options,
+        )
+
+    async def ensure_bucket(self) -> None:
+        if self._bucket_ready:
+            return
+
+        async with self._bucket_lock:
+            if not self._bucket_ready:
+                await self.create_bucket_if_not_exists(self.bucket)
+                self._bucket_ready = True
+
+    @async_integrations_timer
+    async def create_bucket_if_not_exists(self, bucket_name: str) -> bool:
+        try:
+            exists = await self.client.bucket_exists(bucket_name)
+            if not exists:
+                await self.client.make_bucket(bucket_name)
+                logger.info(f"Bucket '{bucket_name}' created.")
+                if self.config.download_mode != "public":
+                    return True
+
+                policy = {
+                    "Version": "2012-10-17",
+                    "Statement": [
+                        {
+                            "Effect": "Allow",
+                            "Principal": {"AWS": "*"},
+                            "Action": ["s3:GetObject"],
+                            "Resource": [f"arn:aws:s3:::{bucket_name}/*"],
+                        }
+                    ],
+                }
+
+                policy_json = json.dumps(policy)
+                await self.client.set_bucket_policy(bucket_name, policy_json)
+                logger.info(f"Public policy set for bucket '{bucket_name}'.")
+                return True
+            else:
+                logger.info(f"Bucket '{bucket_name}' already exists.")
+                return False
+        except S3Error as e:
+            logger.error(f"Error while creating bucket '{bucket_name}': {e}")
+            raise Exception("Error creating bucket")
+
+    @async_integrations_timer
+    async def put_object(self, object_name: str, data: BytesIO | UploadStream, length: int, content_type: str) -> None:
+        await self.client.put_object(
+            bucket_name=self.bucket,
+            object_name=object_name,
+            data=data,
+            length=length,
+            part_size=0 if length >= 0 else MIN_PART_SIZE,
+            content_type=content_type,
+            metadata={"original-name": object_name},
+        )
+
+    @async_integrations_timer
+    async def get_object(
+        self,
+        object_name: str,
+        session: RetryClient,
+        byte_range: str | None = None,
+    ) -> aiohttp.ClientResponse:
+        request_headers = {"Range": byte_range} if byte_range else None
+        response: aiohttp.ClientResponse = await self.client.get_object(
+            self.bucket, object_name, session=session, request_headers=request_headers
+        )
+        return response
+
+    @async_integrations_timer
+    async def stat_object(self, object_name: str) -> Object:
+        stat: Object = await self.client.stat_object(self.bucket, object_name)
+        return stat
+
+    @async_integrations_timer
+    async def remove_object(self, object_name: str) -> None:
+        await self.client.remove_object(self.bucket, object_name)
+
+    @async_integrations_timer
+    async def presigned_get_url(self, object_name: str, expires: timedelta) -> str:
+        url: str = await self.presign_client.get_presigned_url("GET", self.bucket, object_name, expires=expires)
+        return url
+
+
+storage = MinioStorage(settings.minio)
+# Ссылку переиспользуем, пока не истекло 80% её срока жизни
+presigned_url_cache: TTLCache[str, str] = TTLCache(
+    name="presigned_urls",
+    max_size=10_000,
+    ttl=settings.minio.presigned_url_ttl * 0.8,
 )
 
+# Размер чанка, которым ответ MinIO проксируется клиенту
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+_BYTE_RANGE = re.compile(r"^bytes=(\d+-\d*|-\d+)$")
+# Ссылка на скачивание через сервис (режим proxy)
+PROXY_DOWNLOAD_PATH = "/docs/download/{storage_key}"
+# Заголовки ответа MinIO, которые пробрасываются клиенту как есть
+_PROXIED_HEADERS = ("Content-Length", "Content-Range", "ETag", "Last-Modified")
+
 
-async def download_document_from_minio(filename: str) -> StreamingResponse:
+async def serve_document_download(
+    filename: str,
+    range_header: str | None = None,
+    if_range: str | None = None,
+) -> Response:
     """
-    Возвращает PDF-документ из MinIO как StreamingResponse.
-    Бросает HTTPException(404), если файл не найден.
+    По умолчанию отдаёт документ потоком через сервис (Range/If-Range, Content-Disposition).
+    С settings.minio.redirect_downloads в режимах public/presigned отвечает 307 редиректом прямо на MinIO.
+    """
+    if settings.minio.redirect_downloads and settings.minio.download_mode != "proxy":
+        return RedirectResponse(await get_document_download_url(filename), status_code=307)
+
+    return await download_document_from_minio(filename, range_header, if_range)
+
+
+async def _range_not_satisfiable(filename: str) -> HTTPException:
+    """
+    Ответ 416 с текущим размером объекта. Если объект успели удалить или MinIO недоступен,
+    ошибка отображается так же, как при основном запросе.
     """
     try:
-        bucket = settings.minio.docs_bucket
-        async with aiohttp.ClientSession() as minio_session:
-            response = await minio_client.get_object(bucket, filename, session=minio_session)
-            file_data = await response.read()
-            file_stream = BytesIO(file_data)
-
-        logger.info(f"📤 Документ из MinIO успешно получен: {filename}")
-
-        return StreamingResponse(
-            content=file_stream,
-            media_type="application/pdf",
-            headers={"Content-Disposition": f"attachment; filename={filename}"},
-        )
+        stat = await storage.stat_object(filename)
+    except S3Error as e:
+        logger.warning(f"❌ Документ не найден в MinIO: {filename}, ошибка: {e}")
+        return HTTPException(status_code=404, detail="Документ не найден")
+    except Exception as e:
+        logger.error(f"💥 Ошибка при получении документа из MinIO: {e}")
+        return HTTPException(status_code=400, detail="Не удалось получить документ")
+
+    return HTTPException(status_code=416, headers={"Content-Range": f"bytes */{stat.size}"})
+
+
+async def download_document_from_minio(
+    filename: str,
+    range_header: str | None = None,
+    if_range: str | None = None,
+) -> Response:
+    """
+    Отдаёт PDF-документ из MinIO потоком: чанки идут клиенту по мере получения, без буферизации файла.
+    Поддерживает Range/If-Range (ответ 206), диапазон вычисляет сам MinIO.
+    Бросает HTTPException(404), если файл не найден, и HTTPException(416) для недопустимого диапазона.
+    """
+    # Поддерживаем один диапазон байт; прочие варианты по RFC 9110 можно игнорировать
+    byte_range = range_header if range_header and _BYTE_RANGE.match(range_header) else None
+    # Сессия живёт, пока идёт поток; соединение берётся из общего пула и возвращается в него
+    minio_session = storage.session()
+    try:
+        upstream = await storage.get_object(filename, minio_session, byte_range)
+        if byte_range and if_range and not _if_range_matches(if_range, upstream.headers):
+            # Документ изменился с момента предыдущей загрузки — отдаём его целиком
+            upstream.close()
+            upstream = await storage.get_object(filename, minio_session)
 
     except S3Error as e:
+        await minio_session.close()
+        if e.code == "InvalidRange":
+            raise await _range_not_satisfiable(filename) from None
+
         logger.warning(f"❌ Документ не найден в MinIO: {filename}, ошибка: {e}")
         raise HTTPException(status_code=404, detail="Документ не найден")
 
     except Exception as e:
+        await minio_session.close()
         logger.error(f"💥 Ошибка при получении документа из MinIO: {e}")
         raise HTTPException(status_code=400, detail="Не удалось получить документ")
 
+    logger.info(f"📤 Документ из MinIO отдаётся потоком: {filename} (HTTP {upstream.status})")
 
-async def create_bucket_if_not_exists(bucket_name: str) -> bool:
-    try:
-        exists = await minio_client.bucket_exists(bucket_name)
-        if not exists:
-            await minio_client.make_bucket(bucket_name)
-            logger.info(f"Bucket '{bucket_name}' created.")
-            policy = {
-                "Version": "2012-10-17",
-                "Statement": [
-                    {
-                        "Effect": "Allow",
-                        "Principal": {"AWS": "*"},
-                        "Action": ["s3:GetObject"],
-                        "Resource": [f"arn:aws:s3:::{bucket_name}/*"],
-                    }
-                ],
-            }
-
-            policy_json = json.dumps(policy)
-            await minio_client.set_bucket_policy(bucket_name, policy_json)
-            logger.info(f"Public policy set for bucket '{bucket_name}'.")
-            return True
-        else:
-            logger.info(f"Bucket '{bucket_name}' already exists.")
-            return False
-    except S3Error as e:
-        logger.error(f"Error while creating bucket '{bucket_name}': {e}")
-        raise Exception("Error creating bucket")
+    headers = {"Content-Disposition": f"attachment; filename={filename}", "Accept-Ranges": "bytes"}
+    for name in _PROXIED_HEADERS:
+        if name in upstream.headers:
+            headers[name] = upstream.headers[name]
 
+    async def stream() -> AsyncIterator[bytes]:
+        completed = False
+        try:
+            async for chunk in upstream.content.iter_chunked(DOWNLOAD_CHUNK_SIZE):
+                yield chunk
+            completed = True
+        finally:
+            if completed:
+                # Объект дочитан — соединение возвращается в пул
+                upstream.release()
+            else:
+                # Клиент отключился: рвём соединение с MinIO, не дочитывая объект
+                upstream.close()
+            await minio_session.close()
 
-async def upload_document_to_minio(data: BytesIO, content_type: str = "application/pdf") -> str:
-    try:
-        bucket = settings.minio.docs_bucket
-        await create_bucket_if_not_exists(bucket)
+    return StreamingResponse(
+        content=stream(),
+        status_code=upstream.status,
+        media_type="application/pdf",
+        headers=headers,
+    )
 
-        storage_key = f"{uuid4()}.pdf"
-        length = data.getbuffer().nbytes
 
-        await minio_client.put_object(
-            bucket_name=bucket,
-            object_name=storage_key,
-            data=data,
-            length=length,
-            content_type=content_type,
-            metadata={"original-name": storage_key},
-        )
+def _if_range_matches(if_range: str, headers: Mapping[str, str]) -> bool:
+    # If-Range содержит либо сильный ETag, либо дату Last-Modified (RFC 9110, 13.1.5)
+    if if_range.startswith("W/"):
+        return False
+    if if_range.startswith('"'):
+        return if_range == headers.get("ETag")
+    return if_range == headers.get("Last-Modified")
+
+
+def new_storage_key() -> str:
+    return f"{uuid4()}.pdf"
+
+
+async def upload_document_to_minio(
+    data: BytesIO | UploadStream,
+    content_type: str = "application/pdf",
+    storage_key: str | None = None,
+) -> str:
+    """
+    Загружает документ в MinIO.
+    UploadStream читается чанками прямо из загрузки, без промежуточной буферизации всего файла.
+    Ключ можно выбрать заранее, чтобы удалить объект, даже если загрузка прервана.
+    """
+    try:
+        await storage.ensure_bucket()
+
+        storage_key = storage_key or new_storage_key()
+        length = data.getbuffer().nbytes if isinstance(data, BytesIO) else data.length
+        await storage.put_object(storage_key, data, length, content_type)
 
         logger.info(f"PDF документ загружен в MinIO: {storage_key}")
         return storage_key
@@ -102,5 +328,34 @@ async def upload_document_to_minio(data: BytesIO, content_type: str = "applicati
         raise RuntimeError(f"MinIO error: {e.message}") from e
 
 
+async def remove_document_from_minio(storage_key: str) -> None:
+    """
+    Удаляет объект, на который не ссылается ни один документ. Ошибки не пробрасываются:
+    осиротевший объект не должен ломать основной ответ.
+    """
+    try:
+        await storage.remove_object(storage_key)
+        presigned_url_cache.invalidate(storage_key)
+        logger.info(f"PDF документ удалён из MinIO: {storage_key}")
+    except Exception as e:
+        logger.error(f"Не удалось удалить {storage_key} из MinIO: {e}")
+
+
 def get_document_public_url(storage_key: str) -> str:
     return f"http://{settings.minio.outside_endpoint}/{settings.minio.docs_bucket}/{storage_key}"
+
+
+async def get_document_presigned_url(storage_key: str) -> str:
+    url = presigned_url_cache.get(storage_key)
+    if url is None:
+        url = await storage.presigned_get_url(storage_key, timedelta(seconds=settings.minio.presigned_url_ttl))
+        presigned_url_cache.set(storage_key, url)
+    return url
+
+
+async def get_document_download_url(storage_key: str) -> str:
+    if settings.minio.download_mode == "public":
+        return get_document_public_url(storage_key)
+    if settings.minio.download_mode == "presigned":
+        return await get_document_presigned_url(storage_key)
+    return PROXY_DOWNLOAD_PATH.format(storage_key=storage_key)
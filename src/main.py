@@ -5,15 +5,29 @@ from fastapi import APIRouter, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import ORJSONResponse
 
+from conf.config import settings
 from src.integrations.logger import logger
 
 from .api.v1.docs.router import docs_router
+from .api.v1.jobs.router import jobs_router
+from .db.postgres import replica_router
 from .integrations.metrics.metrics import metrics
-from .integrations.metrics.middleware import prometheus_metrics
+from .integrations.metrics.middleware import PrometheusMiddleware, RequestContextMiddleware
+from .integrations.minio import storage
+from .on_startup.bloom import signed_hash_filter_sync
+from .on_startup.jobs import generation_job_worker
 from .on_startup.logger import setup_logger
+from .repositories.doc import document_insert_batcher
+from .utils.pdf_engine import pdf_engine
+from .utils.uploads import UploadLimitMiddleware, ensure_spool_dir
 
 
 def setup_middleware(app: FastAPI) -> None:
+    # Последний добавленный middleware — внешний: запрос проходит CORS → метрики → контекст → лимиты загрузок
+    ensure_spool_dir(settings.uploads)
+    app.add_middleware(UploadLimitMiddleware, config=settings.uploads)
+    app.add_middleware(RequestContextMiddleware, config=settings.tracing)
+    app.add_middleware(PrometheusMiddleware)
     # CORS Middleware should be the last.
     # See https://github.com/tiangolo/fastapi/issues/1663 .
     app.add_middleware(
@@ -23,12 +37,12 @@ def setup_middleware(app: FastAPI) -> None:
         allow_methods=["*"],
         allow_headers=["*"],
     )
-    app.middleware("http")(prometheus_metrics)
 
 
 def setup_routers(app: FastAPI) -> None:
     routers: List[APIRouter] = [
         docs_router,
+        jobs_router,
     ]
     app.add_route("/metrics", metrics)
     for router in routers:
@@ -39,7 +53,18 @@ def setup_routers(app: FastAPI) -> None:
 async def lifespan(app: FastAPI) -> AsyncIterator[None]:
     logger.info("START APP")
     setup_logger()
+    await replica_router.start()
+    await storage.start()
+    await pdf_engine.start()
+    await signed_hash_filter_sync.start()
+    await generation_job_worker.start()
     yield
+    await generation_job_worker.stop()
+    await signed_hash_filter_sync.stop()
+    await pdf_engine.close()
+    await document_insert_batcher.close()
+    await storage.close()
+    await replica_router.stop()
     logger.info("END APP")
 
 
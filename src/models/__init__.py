@@ -1,2 +1,3 @@
 from . import base as base
 from . import document as document
+from . import job as job
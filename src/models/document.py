@@ -1,3 +1,4 @@
+from sqlalchemy import CheckConstraint, Index, LargeBinary, text
 from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy_mixins.timestamp import TimestampsMixin
 
@@ -6,9 +7,20 @@ from .base import IDMixin, ModelBase
 
 class Document(TimestampsMixin, ModelBase, IDMixin):
     __tablename__ = "docs"
+    __table_args__ = (
+        # Дайджесты хранятся как сырые 32 байта SHA-256, а не 64 hex-символа
+        CheckConstraint("octet_length(original_document_hash) = 32", name="original_document_hash_length"),
+        CheckConstraint("octet_length(signed_document_hash) = 32", name="signed_document_hash_length"),
+        # Ключ листинга и keyset-пагинации: ORDER BY created_at DESC, id DESC
+        Index("ix_docs_created_at_id", "created_at", "id"),
+        # Листинг подписанных документов (is_signed=true) без фильтрации всей таблицы
+        Index("ix_docs_signed_created_at_id", "created_at", "id", postgresql_where=text("is_signed")),
+    )
 
-    original_document_hash: Mapped[str] = mapped_column(nullable=False, unique=True)
+    original_document_hash: Mapped[bytes] = mapped_column(LargeBinary(32), nullable=False, unique=True)
     original_document_path: Mapped[str] = mapped_column(nullable=False)
-    signed_document_hash: Mapped[str] = mapped_column(nullable=True, unique=True)
+    signed_document_hash: Mapped[bytes] = mapped_column(LargeBinary(32), nullable=True, unique=True)
     signed_document_path: Mapped[str] = mapped_column(nullable=True)
     is_signed: Mapped[bool] = mapped_column(default=False)
+    # sha256 канонического payload /generate: повторный запрос с теми же данными переиспользует документ
+    payload_fingerprint: Mapped[str] = mapped_column(nullable=True, unique=True)
@@ -0,0 +1,48 @@
+import enum
+from datetime import datetime
+
+from sqlalchemy import TIMESTAMP, BigInteger, Enum, ForeignKey, Index, UniqueConstraint, text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy_mixins.timestamp import TimestampsMixin
+
+from .base import IDMixin, ModelBase
+
+
+class JobItemStatus(enum.StrEnum):
+    PENDING = "pending"
+    PROCESSING = "processing"
+    DONE = "done"
+    FAILED = "failed"
+
+
+class GenerationJob(TimestampsMixin, ModelBase, IDMixin):
+    __tablename__ = "generation_jobs"
+
+    total: Mapped[int] = mapped_column(nullable=False)
+
+
+class GenerationJobItem(ModelBase, IDMixin):
+    __tablename__ = "generation_job_items"
+    __table_args__ = (
+        UniqueConstraint("job_id", "position"),
+        # Очередь воркеров: в индекс попадают только ещё не обработанные элементы
+        Index(
+            "ix_generation_job_items_queue",
+            "id",
+            postgresql_where=text("status IN ('pending', 'processing')"),
+        ),
+    )
+
+    job_id: Mapped[int] = mapped_column(BigInteger, ForeignKey("generation_jobs.id", ondelete="CASCADE"), nullable=False)
+    position: Mapped[int] = mapped_column(nullable=False)
+    payload: Mapped[dict] = mapped_column(JSONB, nullable=False)  # type: ignore
+    status: Mapped[JobItemStatus] = mapped_column(
+        Enum(JobItemStatus, name="job_item_status", values_callable=lambda statuses: [s.value for s in statuses]),
+        default=JobItemStatus.PENDING,
+    )
+    attempts: Mapped[int] = mapped_column(default=0)
+    # Когда элемент взят в работу; по нему находятся элементы упавших воркеров
+    locked_at: Mapped[datetime] = mapped_column(TIMESTAMP, nullable=True)
+    document_id: Mapped[int] = mapped_column(BigInteger, ForeignKey("docs.id"), nullable=True)
+    error: Mapped[str] = mapped_column(nullable=True)
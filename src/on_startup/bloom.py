@@ -0,0 +1,107 @@
+import asyncio
+from typing import Any
+
+from conf.config import settings
+from src.db.postgres import async_session, engine
+from src.integrations.logger import logger
+from src.repositories.doc import SIGNED_HASHES_CHANNEL, DocumentRepository, signed_hash_prefilter, verification_cache
+from src.utils.bloom import BloomFilter
+
+# Как часто проверяем, что соединение LISTEN живо, секунды
+_LISTENER_CHECK_INTERVAL = 5
+# Пауза перед переподключением после ошибки, секунды
+_RECONNECT_DELAY = 5
+
+
+class SignedHashFilterSync:
+    """
+    Поддерживает фильтр Блума подписанных хешей в актуальном состоянии:
+    полная сборка потоковым чтением таблицы docs + LISTEN на канал новых подписей
+    (их публикует DocumentRepository.sign в любом процессе; заодно обновляется кеш проверок).
+    Пока LISTEN не работает, фильтр сброшен и /verify ходит в БД напрямую.
+    """
+
+    def __init__(self) -> None:
+        self._task: asyncio.Task[None] | None = None
+        # Хеши, пришедшие во время пересборки: попадают и в старый, и в новый фильтр
+        self._pending: list[str] | None = None
+
+    async def start(self) -> None:
+        if settings.bloom_filter.enabled and settings.postgres.pgbouncer:
+            # В transaction pooling LISTEN может пройти, но уведомления не доставляются — фильтр бы устаревал
+            logger.warning("⚠️ Фильтр Блума выключен: LISTEN не работает через PgBouncer")
+            return
+
+        if settings.bloom_filter.enabled:
+            self._task = asyncio.create_task(self._run(), name="signed-hash-filter-sync")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        signed_hash_prefilter.replace(None)
+
+    def _on_notify(self, connection: Any, pid: int, channel: str, payload: str) -> None:
+        signed_hash_prefilter.add(payload)
+        # Подпись могла прийти из другого процесса: отрицательный ответ в локальном кеше уже устарел
+        verification_cache.set(payload, True)
+        if self._pending is not None:
+            self._pending.append(payload)
+
+    async def rebuild(self) -> None:
+        self._pending = []
+        try:
+            async with async_session() as session:
+                signed_count = await DocumentRepository.count_signed(session)
+                bloom = BloomFilter(
+                    capacity=max(settings.bloom_filter.min_capacity, int(signed_count * settings.bloom_filter.growth_factor)),
+                    false_positive_rate=settings.bloom_filter.false_positive_rate,
+                )
+                async for hash_ in DocumentRepository.stream_signed_hashes(session):
+                    bloom.add(hash_)
+
+            for hash_ in self._pending:
+                bloom.add(hash_)
+            signed_hash_prefilter.replace(bloom)
+        finally:
+            self._pending = None
+
+        logger.info(f"🌸 Фильтр Блума подписанных хешей собран: {bloom.count} элементов, {bloom.size_bytes} байт")
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                async with engine.connect() as connection:
+                    raw_connection = await connection.get_raw_connection()
+                    listener = raw_connection.driver_connection
+                    if listener is None:
+                        raise RuntimeError("Нет драйверного соединения для LISTEN")
+                    await listener.add_listener(SIGNED_HASHES_CHANNEL, self._on_notify)
+                    try:
+                        # Сначала подписываемся, потом собираем: так ни одна подпись не теряется
+                        await self.rebuild()
+                        rebuilt_at = loop.time()
+                        while not listener.is_closed():
+                            await asyncio.sleep(_LISTENER_CHECK_INTERVAL)
+                            expired = loop.time() - rebuilt_at >= settings.bloom_filter.rebuild_interval
+                            if expired or signed_hash_prefilter.saturated:
+                                await self.rebuild()
+                                rebuilt_at = loop.time()
+                    finally:
+                        if not listener.is_closed():
+                            await listener.remove_listener(SIGNED_HASHES_CHANNEL, self._on_notify)
+
+                logger.warning("⚠️ Соединение LISTEN для фильтра Блума закрыто, переподключаемся")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Ошибка синхронизации фильтра Блума: {e}")
+
+            # Без LISTEN фильтр может устареть — отключаем его до переподключения
+            signed_hash_prefilter.replace(None)
+            await asyncio.sleep(_RECONNECT_DELAY)
+
+
+signed_hash_filter_sync = SignedHashFilterSync()
@@ -0,0 +1,97 @@
+import asyncio
+
+from conf.config import settings
+from src.db.postgres import async_session
+from src.integrations.logger import logger
+from src.integrations.metrics.metrics import GENERATION_JOB_ITEMS
+from src.models.job import GenerationJobItem
+from src.repositories.job import GenerationJobRepository
+from src.schema.info.doc import DocumentCreateDTO
+from src.services.doc import DocumentService
+from src.utils.pdf_engine import PdfEngineOverloadedError
+
+
+class GenerationJobWorker:
+    """
+    Локальный пул воркеров заданий пакетной генерации.
+    Состояние очереди хранится в Postgres (generation_job_items), поэтому задания переживают
+    перезапуск, а воркеры нескольких процессов разбирают одну очередь через SKIP LOCKED.
+    Каждый элемент проходит тот же путь, что и POST /docs/generate.
+    """
+
+    def __init__(self) -> None:
+        self._tasks: list[asyncio.Task[None]] = []
+        self._wakeup = asyncio.Event()
+
+    async def start(self) -> None:
+        if not settings.generation_jobs.enabled:
+            return
+
+        self._tasks = [
+            asyncio.create_task(self._run(), name=f"generation-job-worker-{i}")
+            for i in range(settings.generation_jobs.concurrency)
+        ]
+        logger.info(f"🏭 Запущено воркеров пакетной генерации: {len(self._tasks)}")
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        # Прерванные элементы остаются в processing и будут забраны повторно после stale_after
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def wake(self) -> None:
+        self._wakeup.set()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                async with async_session() as session:
+                    items = await GenerationJobRepository.claim(session, 1, settings.generation_jobs.stale_after)
+
+                if not items:
+                    await self._idle()
+                    continue
+
+                await self._process(items[0])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Ошибка воркера пакетной генерации: {e}")
+                await asyncio.sleep(settings.generation_jobs.poll_interval)
+
+    async def _idle(self) -> None:
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=settings.generation_jobs.poll_interval)
+        except TimeoutError:
+            pass
+        self._wakeup.clear()
+
+    async def _process(self, item: GenerationJobItem) -> None:
+        async with async_session() as session:
+            if item.attempts > settings.generation_jobs.max_attempts:
+                await GenerationJobRepository.fail(session, item.id, item.error or "Превышено число попыток", retry=False)
+                GENERATION_JOB_ITEMS.labels(result="failed").inc()
+                return
+
+            try:
+                created = await DocumentService.create(DocumentCreateDTO.model_validate(item.payload), session)
+            except PdfEngineOverloadedError as e:
+                # Пул PDF занят запросами /generate — отдаём элемент обратно и ждём
+                await GenerationJobRepository.release(session, item.id)
+                GENERATION_JOB_ITEMS.labels(result="deferred").inc()
+                await asyncio.sleep(e.retry_after)
+                return
+            except Exception as e:
+                await session.rollback()
+                retry = item.attempts < settings.generation_jobs.max_attempts
+                logger.warning(f"⚠️ Элемент {item.id} задания {item.job_id} не сгенерирован (попытка {item.attempts}): {e}")
+                await GenerationJobRepository.fail(session, item.id, str(e), retry)
+                GENERATION_JOB_ITEMS.labels(result="retried" if retry else "failed").inc()
+                return
+
+            await GenerationJobRepository.complete(session, item.id, created.id)
+            GENERATION_JOB_ITEMS.labels(result="done").inc()
+
+
+generation_job_worker = GenerationJobWorker()
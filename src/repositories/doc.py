@@ -1,71 +1,298 @@
-import hashlib
+from collections.abc import AsyncIterator
 from typing import Any, Optional, Sequence
 
-import aiofiles
-from sqlalchemy import func, select
+import orjson
+from sqlakeyset import serialize_bookmark
+from sqlakeyset.asyncio import select_page
+from sqlalchemy import LargeBinary, Select, any_, bindparam, func, insert, not_, select, text, update
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
 
+from conf.config import settings
+from src.db.postgres import BYPASS_PREFILTER, async_session
+from src.integrations.metrics.metrics import async_stage_timer
 from src.models.document import Document
 from src.repositories.base import Repository
 from src.schema.info.doc import DocumentFilters
+from src.utils.batcher import MicroBatcher
+from src.utils.bloom import BloomPrefilter
+from src.utils.cache import TTLCache
 
+# Канал LISTEN/NOTIFY, по которому все процессы узнают о новых подписанных хешах
+SIGNED_HASHES_CHANNEL = "signed_hashes"
 
+# Кеш результатов проверки подписанных хешей: hash -> зарегистрирован ли
+verification_cache: TTLCache[str, bool] = TTLCache(
+    name="verification",
+    max_size=settings.verification_cache.max_size,
+    ttl=settings.verification_cache.ttl,
+)
+# Фильтр Блума по всем signed_document_hash: отсекает неизвестные хеши без запроса в БД
+signed_hash_prefilter = BloomPrefilter(name="signed_hashes")
+
+# Порядок листинга: новые документы первыми, (created_at, id) — ключ keyset-пагинации
+LIST_ORDER = (Document.created_at.desc(), Document.id.desc())
+
+
+async def _insert_documents(rows: list[dict[str, Any]]) -> list[Document | Exception]:
+    # Один многострочный INSERT ... RETURNING в одной транзакции: один коммит (fsync) на пакет
+    async with async_session() as session:
+        try:
+            result = await session.execute(insert(Document).returning(Document, sort_by_parameter_order=True), rows)
+            docs: list[Document | Exception] = list(result.scalars().all())
+            await session.commit()
+            return docs
+        except IntegrityError:
+            await session.rollback()
+
+    # Дубликат в пакете не должен ронять остальные строки: вставляем их по одной
+    results: list[Document | Exception] = []
+    for row in rows:
+        async with async_session() as session:
+            try:
+                result = await session.execute(insert(Document).values(**row).returning(Document))
+                doc = result.scalar_one()
+                await session.commit()
+                results.append(doc)
+            except IntegrityError as e:
+                await session.rollback()
+                results.append(e)
+    return results
+
+
+document_insert_batcher: MicroBatcher[dict[str, Any], Document] = MicroBatcher(
+    name="documents",
+    flush=_insert_documents,
+    max_size=settings.insert_batching.max_rows,
+    max_delay=settings.insert_batching.max_delay_ms / 1000,
+)
+
+
+# Публичные методы принимают и возвращают hex-строки, в БД дайджесты хранятся как BYTEA
 class DocumentRepository(Repository):
     @staticmethod
-    async def create(session: AsyncSession, hash_: str, minio_path: str) -> Document:
-        doc = Document(original_document_hash=hash_, original_document_path=minio_path, is_signed=False)
+    @async_stage_timer
+    async def create(session: AsyncSession, hash_: str, minio_path: str, payload_fingerprint: str | None = None) -> Document:
+        values = {
+            "original_document_hash": bytes.fromhex(hash_),
+            "original_document_path": minio_path,
+            "is_signed": False,
+            "payload_fingerprint": payload_fingerprint,
+        }
+        if settings.insert_batching.enabled:
+            # Вставка уходит общим пакетом в отдельной транзакции; дубликат — IntegrityError, как и без пакета
+            return await document_insert_batcher.submit(values)
+
+        doc = Document(**values)
         session.add(doc)
         await session.commit()
         await session.refresh(doc)
         return doc
 
     @staticmethod
-    async def calculate_sha256(file_path: str) -> str:
-        hash_func = hashlib.sha256()
-        async with aiofiles.open(file_path, "rb") as f:
-            while chunk := await f.read(4096):
-                hash_func.update(chunk)
-        return hash_func.hexdigest()
+    @async_stage_timer
+    async def get_by_hash(hash_: str, session: AsyncSession) -> Optional[Document]:
+        result = await session.execute(select(Document).where(Document.original_document_hash == bytes.fromhex(hash_)))
+        return result.scalar_one_or_none()
 
     @staticmethod
-    async def get_by_hash(hash_: str, session: AsyncSession) -> Optional[Document]:
-        result = await session.execute(select(Document).where(Document.original_document_hash == hash_))
+    @async_stage_timer
+    async def get_by_fingerprint(fingerprint: str, session: AsyncSession) -> Optional[Document]:
+        result = await session.execute(select(Document).where(Document.payload_fingerprint == fingerprint))
         return result.scalar_one_or_none()
 
     @staticmethod
-    async def add_signature(session: AsyncSession, doc: Document, storage_key: str, signed_hash: str) -> Document:
-        doc.signed_document_hash = signed_hash
-        doc.signed_document_path = storage_key
-        doc.is_signed = True
-        session.add(doc)
+    @async_stage_timer
+    async def sign(session: AsyncSession, original_hash: str, storage_key: str, signed_hash: str) -> Optional[Document]:
+        """
+        Атомарная подпись одним запросом: условный UPDATE не даст подписать документ дважды
+        даже при одновременных запросах, а pg_notify в том же запросе доставит хеш остальным
+        процессам после коммита. None — документа нет или он уже подписан.
+        Дубликат signed_document_hash приводит к IntegrityError.
+        """
+        signed = (
+            update(Document)
+            .where(Document.original_document_hash == bytes.fromhex(original_hash), Document.is_signed.is_(False))
+            .values(signed_document_hash=bytes.fromhex(signed_hash), signed_document_path=storage_key, is_signed=True)
+            .returning(*Document.__table__.c)
+            .cte("signed")
+        )
+        signed_doc = aliased(Document, signed)
+        result = await session.execute(
+            select(signed_doc, func.pg_notify(SIGNED_HASHES_CHANNEL, func.encode(signed.c.signed_document_hash, "hex")))
+        )
+        doc: Optional[Document] = result.scalars().one_or_none()
         await session.commit()
-        await session.refresh(doc)
+        if doc is None:
+            return None
+
+        # Перезаписываем возможный отрицательный ответ, закешированный до подписи
+        verification_cache.set(signed_hash, True)
+        signed_hash_prefilter.add(signed_hash)
         return doc
 
     @staticmethod
+    @async_stage_timer
     async def get_by_signed_hash(hash_: str, session: AsyncSession) -> Optional[Document]:
-        result = await session.execute(select(Document).where(Document.signed_document_hash == hash_))
+        result = await session.execute(select(Document).where(Document.signed_document_hash == bytes.fromhex(hash_)))
         return result.scalar_one_or_none()
 
     @staticmethod
+    @async_stage_timer
+    async def is_signed_hash_registered(hash_: str, session: AsyncSession) -> bool:
+        # С токеном согласованности хеш мог быть подписан в соседнем процессе, NOTIFY от которого
+        # сюда ещё не дошёл: отрицательным ответам фильтра Блума и кеша верить нельзя
+        bypass_prefilter = session.info.get(BYPASS_PREFILTER, False)
+
+        cached = verification_cache.get(hash_)
+        if cached is not None and (cached or not bypass_prefilter):
+            return cached
+
+        if not bypass_prefilter and not signed_hash_prefilter.might_contain(hash_):
+            return False
+
+        registered = await DocumentRepository.get_by_signed_hash(hash_, session) is not None
+        DocumentRepository._remember_verification(hash_, registered)
+        return registered
+
+    @staticmethod
+    @async_stage_timer
+    async def get_registered_signed_hashes(hashes: Sequence[str], session: AsyncSession) -> set[str]:
+        # Один параметр-массив вместо N параметров IN (...)
+        stmt = select(Document.signed_document_hash).where(
+            Document.signed_document_hash
+            == any_(bindparam("hashes", [bytes.fromhex(hash_) for hash_ in hashes], type_=ARRAY(LargeBinary)))
+        )
+        result = await session.execute(stmt)
+        return {digest.hex() for digest in result.scalars()}
+
+    @staticmethod
+    @async_stage_timer
+    async def are_signed_hashes_registered(hashes: Sequence[str], session: AsyncSession) -> dict[str, bool]:
+        # Те же правила, что и в is_signed_hash_registered
+        bypass_prefilter = session.info.get(BYPASS_PREFILTER, False)
+
+        registered: dict[str, bool] = {}
+        unresolved: list[str] = []
+        for hash_ in dict.fromkeys(hashes):
+            cached = verification_cache.get(hash_)
+            if cached is not None and (cached or not bypass_prefilter):
+                registered[hash_] = cached
+            elif not bypass_prefilter and not signed_hash_prefilter.might_contain(hash_):
+                registered[hash_] = False
+            else:
+                unresolved.append(hash_)
+
+        if unresolved:
+            found = await DocumentRepository.get_registered_signed_hashes(unresolved, session)
+            for hash_ in unresolved:
+                registered[hash_] = hash_ in found
+                DocumentRepository._remember_verification(hash_, registered[hash_])
+
+        return registered
+
+    @staticmethod
+    def _remember_verification(hash_: str, registered: bool) -> None:
+        verification_cache.set(hash_, registered, ttl=None if registered else settings.verification_cache.negative_ttl)
+        if registered:
+            # Найденный в БД хеш мог ещё не дойти до фильтра Блума через NOTIFY
+            signed_hash_prefilter.add(hash_)
+
+    @staticmethod
+    @async_stage_timer
+    async def count_signed(session: AsyncSession) -> int:
+        result = await session.execute(select(func.count()).where(Document.signed_document_hash.is_not(None)))
+        return result.scalar_one()
+
+    @staticmethod
+    async def stream_signed_hashes(session: AsyncSession, batch_size: int = 10_000) -> AsyncIterator[str]:
+        stmt = select(Document.signed_document_hash).where(Document.signed_document_hash.is_not(None))
+        result = await session.stream_scalars(stmt.execution_options(yield_per=batch_size))
+        async for digest in result:
+            yield digest.hex()
+
+    @staticmethod
+    def _list_stmt(query_filters: DocumentFilters) -> Select[tuple[Document]]:
+        stmt = select(Document)
+
+        # Предикат пишется литералом, а не is_signed = $1: иначе в generic-плане подготовленного
+        # оператора Postgres не докажет условие частичного индекса ix_docs_signed_created_at_id
+        if query_filters.is_signed is True:
+            stmt = stmt.where(Document.is_signed)
+        elif query_filters.is_signed is False:
+            stmt = stmt.where(not_(Document.is_signed))
+
+        return stmt
+
+    @staticmethod
+    def _cursor_after(doc: Document) -> str:
+        # Тот же формат закладки, что выдаёт sqlakeyset: ключ (created_at, id) последней строки
+        return serialize_bookmark(((doc.created_at, doc.id), False))
+
+    @staticmethod
+    @async_stage_timer
     async def get_all(
         query_filters: DocumentFilters,
         limit: int,
         offset: int,
         session: AsyncSession,
-    ) -> tuple[Sequence[Document], Any]:
-        stmt = select(Document)
+    ) -> tuple[Sequence[Document], str | None]:
+        stmt = DocumentRepository._list_stmt(query_filters).order_by(*LIST_ORDER).offset(offset).limit(limit)
 
-        if query_filters.is_signed is not None:
-            stmt = stmt.where(Document.is_signed == query_filters.is_signed)
+        result = await session.execute(stmt)
+        docs = result.scalars().all()
 
-        total_stmt = stmt.with_only_columns(func.count()).order_by(None)
-        stmt = stmt.offset(offset).limit(limit)
+        next_cursor = DocumentRepository._cursor_after(docs[-1]) if len(docs) == limit else None
+        return docs, next_cursor
 
+    @staticmethod
+    @async_stage_timer
+    async def get_page_after(
+        query_filters: DocumentFilters,
+        limit: int,
+        cursor: str,
+        session: AsyncSession,
+    ) -> tuple[Sequence[Document], str | None]:
+        # Keyset-пагинация: WHERE (created_at, id) < (:created_at, :id), без OFFSET
+        stmt = DocumentRepository._list_stmt(query_filters).order_by(*LIST_ORDER)
+        page = await select_page(session, stmt, per_page=limit, page=cursor)
+
+        docs = [row[0] for row in page]
+        next_cursor = page.paging.bookmark_next if page.paging.has_next else None
+        return docs, next_cursor
+
+    @staticmethod
+    @async_stage_timer
+    async def count(query_filters: DocumentFilters, session: AsyncSession) -> int:
+        stmt = DocumentRepository._list_stmt(query_filters).with_only_columns(func.count()).order_by(None)
         result = await session.execute(stmt)
-        docs = result.scalars().all()
+        return result.scalar_one()
+
+    @staticmethod
+    @async_stage_timer
+    async def estimate_count(query_filters: DocumentFilters, session: AsyncSession) -> int:
+        stmt = DocumentRepository._list_stmt(query_filters)
 
-        total_result = await session.execute(total_stmt)
-        total_count = total_result.scalar_one()
+        if stmt.whereclause is None:
+            # Без фильтров достаточно статистики планировщика по таблице
+            result = await session.execute(
+                text("SELECT reltuples::bigint FROM pg_class WHERE oid = CAST(:table AS regclass)"),
+                {"table": Document.__tablename__},
+            )
+            reltuples = result.scalar_one()
+            # -1: таблица ещё ни разу не анализировалась
+            if reltuples >= 0:
+                return int(reltuples)
 
-        return docs, total_count
+        # С фильтрами берём оценку строк из плана запроса. Значения фильтров передаются
+        # параметрами драйвера, а не подставляются в текст SQL
+        compiled = stmt.compile(dialect=session.get_bind().dialect)
+        parameters = tuple(compiled.params[name] for name in compiled.positiontup or ())
+        connection = await session.connection()
+        result = await connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", parameters)
+        plan = result.scalar_one()
+        if isinstance(plan, str):
+            plan = orjson.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
@@ -0,0 +1,125 @@
+from datetime import timedelta
+from typing import Any, Optional, Sequence
+
+from sqlalchemy import and_, func, insert, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.integrations.metrics.metrics import async_stage_timer
+from src.models.document import Document
+from src.models.job import GenerationJob, GenerationJobItem, JobItemStatus
+from src.repositories.base import Repository
+
+
+class GenerationJobRepository(Repository):
+    @staticmethod
+    @async_stage_timer
+    async def create(session: AsyncSession, payloads: list[dict[str, Any]]) -> GenerationJob:
+        job = GenerationJob(total=len(payloads))
+        session.add(job)
+        await session.flush()
+        # executemany: SQLAlchemy склеивает строки в многострочные INSERT пачками
+        await session.execute(
+            insert(GenerationJobItem),
+            [{"job_id": job.id, "position": position, "payload": payload} for position, payload in enumerate(payloads)],
+        )
+        await session.commit()
+        return job
+
+    @staticmethod
+    @async_stage_timer
+    async def get(job_id: int, session: AsyncSession) -> Optional[GenerationJob]:
+        return await session.get(GenerationJob, job_id)
+
+    @staticmethod
+    @async_stage_timer
+    async def count_items_by_status(job_id: int, session: AsyncSession) -> dict[JobItemStatus, int]:
+        result = await session.execute(
+            select(GenerationJobItem.status, func.count())
+            .where(GenerationJobItem.job_id == job_id)
+            .group_by(GenerationJobItem.status)
+        )
+        return {status: count for status, count in result.tuples()}
+
+    @staticmethod
+    @async_stage_timer
+    async def get_items(
+        job_id: int, limit: int, offset: int, session: AsyncSession
+    ) -> Sequence[tuple[GenerationJobItem, Optional[Document]]]:
+        result = await session.execute(
+            select(GenerationJobItem, Document)
+            .outerjoin(Document, Document.id == GenerationJobItem.document_id)
+            .where(GenerationJobItem.job_id == job_id)
+            .order_by(GenerationJobItem.position)
+            .limit(limit)
+            .offset(offset)
+        )
+        return result.tuples().all()
+
+    @staticmethod
+    @async_stage_timer
+    async def claim(session: AsyncSession, limit: int, stale_after: float) -> Sequence[GenerationJobItem]:
+        """
+        Забирает элементы в работу. SKIP LOCKED позволяет нескольким воркерам (и процессам)
+        разбирать очередь без блокировок друг друга; элементы, зависшие в processing дольше
+        stale_after (воркер упал или перезапущен), забираются повторно.
+        """
+        claimable = (
+            select(GenerationJobItem.id)
+            .where(
+                or_(
+                    GenerationJobItem.status == JobItemStatus.PENDING,
+                    and_(
+                        GenerationJobItem.status == JobItemStatus.PROCESSING,
+                        GenerationJobItem.locked_at < func.now() - timedelta(seconds=stale_after),
+                    ),
+                )
+            )
+            .order_by(GenerationJobItem.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        result = await session.execute(
+            update(GenerationJobItem)
+            .where(GenerationJobItem.id.in_(claimable))
+            .values(
+                status=JobItemStatus.PROCESSING,
+                locked_at=func.now(),
+                attempts=GenerationJobItem.attempts + 1,
+            )
+            .returning(GenerationJobItem)
+            .execution_options(synchronize_session=False)
+        )
+        items = result.scalars().all()
+        await session.commit()
+        return items
+
+    @staticmethod
+    @async_stage_timer
+    async def complete(session: AsyncSession, item_id: int, document_id: int) -> None:
+        await session.execute(
+            update(GenerationJobItem)
+            .where(GenerationJobItem.id == item_id)
+            .values(status=JobItemStatus.DONE, document_id=document_id, locked_at=None, error=None)
+        )
+        await session.commit()
+
+    @staticmethod
+    @async_stage_timer
+    async def fail(session: AsyncSession, item_id: int, error: str, retry: bool) -> None:
+        await session.execute(
+            update(GenerationJobItem)
+            .where(GenerationJobItem.id == item_id)
+            .values(status=JobItemStatus.PENDING if retry else JobItemStatus.FAILED, locked_at=None, error=error)
+        )
+        await session.commit()
+
+    @staticmethod
+    @async_stage_timer
+    async def release(session: AsyncSession, item_id: int) -> None:
+        # Возврат в очередь без ошибки (например, пул PDF перегружен): попытка не засчитывается
+        await session.execute(
+            update(GenerationJobItem)
+            .where(GenerationJobItem.id == item_id)
+            .values(status=JobItemStatus.PENDING, locked_at=None, attempts=GenerationJobItem.attempts - 1)
+        )
+        await session.commit()
@@ -1,4 +1,4 @@
-from typing import Generic, TypeVar
+from typing import Generic, Literal, TypeVar
 
 from pydantic import BaseModel, ConfigDict, Field
 
@@ -10,15 +10,27 @@ class Base(BaseModel):
 T = TypeVar("T", bound=Base)
 
 
+# exact — COUNT(*), estimate — оценка планировщика, none — не считать
+TotalMode = Literal["exact", "estimate", "none"]
+
+
 class Page(Base, Generic[T]):
     data: list[T]
-    total_pages: int
+    total_pages: int | None = None
+    next_cursor: str | None = None
 
 
 class PageMixin(Base):
     page: int = Field(1, ge=1)
 
 
+class CursorMixin(Base):
+    # Непрозрачный курсор из next_cursor предыдущей страницы; если задан, page игнорируется
+    cursor: str | None = Field(None, min_length=1)
+    # По умолчанию exact для постраничного режима и estimate для курсорного
+    total: TotalMode | None = None
+
+
 class SearchMixin(Base):
     search: str | None = Field(None, min_length=1)
 
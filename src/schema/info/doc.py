@@ -1,4 +1,19 @@
-from src.schema.base import Base, PageMixin
+from typing import Annotated
+
+from pydantic import BeforeValidator, StringConstraints
+
+from src.schema.base import Base, CursorMixin, PageMixin
+
+# Hex-представление SHA-256, приводится к нижнему регистру
+Sha256Hex = Annotated[str, StringConstraints(strip_whitespace=True, to_lower=True, pattern=r"^[0-9a-fA-F]{64}$")]
+
+
+def _digest_to_hex(value: object) -> object:
+    return value.hex() if isinstance(value, bytes) else value
+
+
+# Дайджест хранится в БД как BYTEA(32), наружу отдаётся hex-строкой
+HexDigest = Annotated[str, BeforeValidator(_digest_to_hex)]
 
 
 class DocumentCreateDTO(Base):
@@ -9,27 +24,42 @@ class DocumentCreateDTO(Base):
 
 class DocumentCreatedResponse(Base):
     id: int
-    original_document_hash: str
+    original_document_hash: HexDigest
     link_to_download: str | None = None
 
 
 class DocumentSignedResponse(Base):
     id: int
-    signed_document_hash: str
+    signed_document_hash: HexDigest
 
 
 class DocumentValidationResponse(Base):
     valid: bool
 
 
+class DocumentHashValidationDTO(Base):
+    sha256: Sha256Hex
+
+
+class DocumentBatchValidationItem(Base):
+    sha256: str | None = None
+    filename: str | None = None
+    valid: bool
+    error: str | None = None
+
+
+class DocumentBatchValidationResponse(Base):
+    results: list[DocumentBatchValidationItem]
+
+
 class DocumentGetDTO(Base):
     id: int
-    original_document_hash: str
+    original_document_hash: HexDigest
     original_document_path: str
-    signed_document_hash: str | None = None
+    signed_document_hash: HexDigest | None = None
     signed_document_path: str | None = None
     is_signed: bool
 
 
-class DocumentFilters(PageMixin):
+class DocumentFilters(PageMixin, CursorMixin):
     is_signed: bool | None = None
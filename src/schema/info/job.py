@@ -0,0 +1,46 @@
+from datetime import datetime
+from typing import Literal
+
+from pydantic import Field
+
+from src.models.job import JobItemStatus
+from src.schema.base import Base, Page, PageMixin
+from src.schema.info.doc import DocumentCreateDTO, HexDigest
+
+# pending — ни один элемент ещё не взят, running — идёт обработка, completed — все элементы done/failed
+JobStatus = Literal["pending", "running", "completed"]
+
+
+class GenerationBatchCreateDTO(Base):
+    items: list[DocumentCreateDTO] = Field(min_length=1)
+
+
+class GenerationJobCreatedResponse(Base):
+    id: int
+    total: int
+
+
+class GenerationJobItemResult(Base):
+    position: int
+    status: JobItemStatus
+    attempts: int
+    document_id: int | None = None
+    original_document_hash: HexDigest | None = None
+    link_to_download: str | None = None
+    error: str | None = None
+
+
+class GenerationJobFilters(PageMixin):
+    pass
+
+
+class GenerationJobResponse(Base):
+    id: int
+    status: JobStatus
+    total: int
+    pending: int
+    processing: int
+    done: int
+    failed: int
+    created_at: datetime
+    results: Page[GenerationJobItemResult]
@@ -1,17 +1,27 @@
 import asyncio
-import tempfile
 from io import BytesIO
+from typing import Any
 
 from fastapi import UploadFile
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.integrations.logger import logger
-from src.integrations.minio import get_document_public_url, upload_document_to_minio
+from conf.config import settings
+from src.integrations.logger import logger as app_logger
+from src.integrations.metrics.metrics import stage_timer
+from src.integrations.minio import (
+    get_document_download_url,
+    new_storage_key,
+    remove_document_from_minio,
+    upload_document_to_minio,
+)
 
 from ..models.document import Document
 from ..repositories.doc import DocumentRepository
 from ..schema.base import Page
 from ..schema.info.doc import (
+    DocumentBatchValidationItem,
+    DocumentBatchValidationResponse,
     DocumentCreatedResponse,
     DocumentCreateDTO,
     DocumentFilters,
@@ -19,31 +29,89 @@ from ..schema.info.doc import (
     DocumentSignedResponse,
     DocumentValidationResponse,
 )
-from ..utils.generate_pdf import generate_pdf_from_data
+from ..utils.generate_pdf import payload_fingerprint
+from ..utils.hashing import hash_buffer
+from ..utils.ingest import UploadStream
 from ..utils.pagination import get_total_pages, page_to_limit_offset
+from ..utils.pdf_engine import pdf_engine
+from ..utils.singleflight import SingleFlight
+
+# Логгер горячих путей запросов: его INFO можно сэмплировать в conf/logging.conf.yml
+logger = app_logger.getChild("docs")
+
+# fingerprint payload -> (hash, storage_key) рендера, выполняющегося прямо сейчас
+_generate_flights: SingleFlight[str, tuple[str, str]] = SingleFlight(name="generate")
+
+# Фоновые задачи удаления объектов отклонённых подписей (ссылки держим до завершения)
+_discarded_uploads: set[asyncio.Task[None]] = set()
+
+
+async def _stop_upload(signed: UploadStream, upload: asyncio.Task[str], storage_key: str) -> None:
+    # put_object не отменяем: miniopy прерывает multipart-загрузку только при обычном исключении,
+    # а после отмены незавершённые части остались бы в bucket. Вместо этого останавливаем чтение:
+    # следующий read() упадёт, и put_object сам прервёт multipart. Ждём его здесь, чтобы после
+    # ответа файл запроса (и его место в бюджете загрузок) больше не читался
+    signed.abort()
+    await asyncio.gather(upload, return_exceptions=True)
+    if upload.cancelled() or upload.exception() is not None:
+        return
+
+    # Загрузка успела завершиться: объект удаляется в фоне, ответ не ждёт MinIO
+    discard = asyncio.create_task(remove_document_from_minio(storage_key))
+    _discarded_uploads.add(discard)
+    discard.add_done_callback(_discarded_uploads.discard)
 
 
 class DocumentService:
     @staticmethod
     async def create(dto: DocumentCreateDTO, session: AsyncSession) -> DocumentCreatedResponse:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
-            path = tmp_file.name
-            await asyncio.to_thread(generate_pdf_from_data, dto.model_dump(), path)
+        payload = dto.model_dump()
+        # Повторный запрос с теми же данными получает уже созданный документ; побайтно одинаковый
+        # рендер для этого не нужен, поэтому переиспользование не зависит от pdf_engine.deterministic
+        fingerprint = payload_fingerprint(payload)
 
-        hash_ = await DocumentRepository.calculate_sha256(path)
+        existing = await DocumentRepository.get_by_fingerprint(fingerprint, session)
+        if existing is not None:
+            logger.info(f"♻️ Документ с теми же данными уже создан (id={existing.id})")
+            return await DocumentService._created_response(existing)
 
-        with open(path, "rb") as f:
-            file_data = BytesIO(f.read())
+        # Одновременные одинаковые запросы ждут один рендер и одну загрузку
+        hash_, storage_key = await _generate_flights.do(fingerprint, lambda: DocumentService._render_and_upload(payload))
+
+        try:
+            doc = await DocumentRepository.create(session, hash_, storage_key, fingerprint)
+        except IntegrityError:
+            # Тот же документ успел сохранить другой запрос (например, в соседнем процессе)
+            await session.rollback()
+            existing = await DocumentRepository.get_by_fingerprint(fingerprint, session)
+            if existing is None:
+                existing = await DocumentRepository.get_by_hash(hash_, session)
+            if existing is None:
+                raise
+            if existing.original_document_path != storage_key:
+                await remove_document_from_minio(storage_key)
+            doc = existing
+            logger.info(f"♻️ Документ с теми же данными сохранён параллельным запросом (id={doc.id})")
+
+        return await DocumentService._created_response(doc)
 
-        storage_key = await upload_document_to_minio(file_data)
-        link_to_download = get_document_public_url(storage_key)
+    @staticmethod
+    async def _render_and_upload(payload: dict[str, Any]) -> tuple[str, str]:
+        # Документ живёт только в памяти: один буфер и для хеша, и для загрузки
+        document = await pdf_engine.render(payload)
+        with stage_timer("hash"):
+            hash_ = (await hash_buffer(document))["sha256"]
 
-        doc = await DocumentRepository.create(session, hash_, storage_key)
+        # BytesIO над bytes не копирует буфер, пока его не начнут изменять
+        storage_key = await upload_document_to_minio(BytesIO(document))
+        return hash_, storage_key
 
+    @staticmethod
+    async def _created_response(doc: Document) -> DocumentCreatedResponse:
         return DocumentCreatedResponse(
             id=doc.id,
             original_document_hash=doc.original_document_hash,
-            link_to_download=link_to_download,
+            link_to_download=await get_document_download_url(doc.original_document_path),
         )
 
     @staticmethod
@@ -60,53 +128,51 @@ class DocumentService:
                 logger.warning(f"⛔ Неверный формат подписанного файла: {signed_file.content_type}")
                 raise ValueError("Подписанный файл должен быть в формате PDF")
 
-            # --- ORIGINAL FILE ---
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as original_tmp:
-                original_path = original_tmp.name
-                original_content = await original_file.read()
-                original_tmp.write(original_content)
-
-            logger.info(f"📄 Оригинал сохранён: {original_path}")
-            original_hash = await DocumentRepository.calculate_sha256(original_path)
-            logger.info(f"🔍 Хеш оригинала: {original_hash}")
-
-            doc = await DocumentRepository.get_by_hash(original_hash, session)
-            if not doc:
-                logger.warning("❌ Оригинальный документ не найден")
-                raise ValueError("Оригинальный документ не зарегистрирован")
-
-            # 2. Запрещаем повторную подпись
-            if doc.is_signed:
-                logger.warning(f"🚫 Попытка повторной подписи уже подписанного документа (id={doc.id})")
-                raise ValueError("Этот документ уже был подписан ранее")
-
-            # --- SIGNED FILE ---
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as signed_tmp:
-                signed_path = signed_tmp.name
-                signed_content = await signed_file.read()
-                signed_tmp.write(signed_content)
-
-            logger.info(f"📄 Подписанный файл сохранён: {signed_path}")
-            signed_hash = await DocumentRepository.calculate_sha256(signed_path)
-            logger.info(f"🔐 Хеш подписанного файла: {signed_hash}")
-
-            # 3. Проверка дубликата среди уже подписанных
-            existing = await DocumentRepository.get_by_signed_hash(signed_hash, session)
-            if existing:
-                logger.warning(f"❌ Подписанный документ уже существует (id={existing.id})")
-                raise ValueError("Этот подписанный файл уже зарегистрирован")
-
-            # 4. Загрузка в MinIO
-            signed_io = BytesIO(signed_content)
-            storage_key = await upload_document_to_minio(signed_io)
-            logger.info(f"☁️ Загружен в MinIO: {storage_key}")
-
-            updated = await DocumentRepository.add_signature(session, doc, storage_key, signed_hash)
+            # 2. Подписанный файл сразу уходит в MinIO и хешируется по ходу загрузки,
+            # параллельно с хешированием оригинала и проверками в БД
+            signed = UploadStream(signed_file)
+            storage_key = new_storage_key()
+            upload = asyncio.create_task(upload_document_to_minio(signed, storage_key=storage_key))
+
+            try:
+                original = await UploadStream(original_file).drain()
+                logger.info(f"🔍 Хеш оригинала: {original.sha256} ({original.size} байт)")
+
+                # Ранний отказ, пока подписанный файл ещё загружается
+                rejection = DocumentService._sign_rejection_reason(
+                    await DocumentRepository.get_by_hash(original.sha256, session)
+                )
+                if rejection is not None:
+                    raise ValueError(rejection)
+
+                await upload
+                logger.info(f"🔐 Хеш подписанного файла: {signed.sha256} ({signed.size} байт)")
+                logger.info(f"☁️ Загружен в MinIO: {storage_key}")
+
+                # 3. Атомарная подпись: запрет повторной подписи при гонке
+                # и уникальность подписанного хеша проверяет один условный UPDATE
+                updated = await DocumentRepository.sign(session, original.sha256, storage_key, signed.sha256)
+                if updated is None:
+                    # Документ успели подписать параллельно — перечитываем причину
+                    rejection = DocumentService._sign_rejection_reason(
+                        await DocumentRepository.get_by_hash(original.sha256, session)
+                    )
+                    raise ValueError(rejection or "Этот документ уже был подписан ранее")
+            except IntegrityError as e:
+                await session.rollback()
+                await remove_document_from_minio(storage_key)
+                logger.warning(f"❌ Подписанный документ уже существует: {signed.sha256}")
+                raise ValueError("Этот подписанный файл уже зарегистрирован") from e
+            except BaseException:
+                # Компенсация: подпись не записана — загрузка останавливается, объект удаляется
+                await _stop_upload(signed, upload, storage_key)
+                raise
+
             logger.info(f"✅ Успешно обновлён документ (id={updated.id})")
 
             return DocumentSignedResponse(
                 id=updated.id,
-                signed_document_hash=signed_hash,
+                signed_document_hash=signed.sha256,
             )
 
         except ValueError as ve:
@@ -117,6 +183,18 @@ class DocumentService:
             logger.error(f"❌ Неизвестная ошибка при подписи: {e}")
             raise ValueError("Не удалось завершить процесс подписи. Повторите позже или проверьте данные.")
 
+    @staticmethod
+    def _sign_rejection_reason(doc: Document | None) -> str | None:
+        if doc is None:
+            logger.warning("❌ Оригинальный документ не найден")
+            return "Оригинальный документ не зарегистрирован"
+
+        if doc.is_signed:
+            logger.warning(f"🚫 Попытка повторной подписи уже подписанного документа (id={doc.id})")
+            return "Этот документ уже был подписан ранее"
+
+        return None
+
     @staticmethod
     async def verify(uploaded_file: UploadFile, session: AsyncSession) -> DocumentValidationResponse:
         try:
@@ -127,27 +205,12 @@ class DocumentService:
                 logger.warning(f"⛔ Неверный формат файла: {uploaded_file.content_type}")
                 raise ValueError("Файл должен быть в формате PDF")
 
-            # 2. Сохраняем во временный файл
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
-                tmp_path = tmp.name
-                content = await uploaded_file.read()
-                tmp.write(content)
-
-            logger.info(f"📄 Временный файл сохранён как {tmp_path}")
-
-            # 3. Считаем хеш
-            hash_ = await DocumentRepository.calculate_sha256(tmp_path)
-            logger.info(f"🔍 Хеш файла: {hash_}")
+            # 2. Считаем хеш за один проход по загрузке
+            uploaded = await UploadStream(uploaded_file).drain()
+            logger.info(f"🔍 Хеш файла: {uploaded.sha256} ({uploaded.size} байт)")
 
-            # 4. Ищем по signed_document_hash
-            doc = await DocumentRepository.get_by_signed_hash(hash_, session)
-
-            if doc is not None:
-                logger.info(f"✅ Документ валиден: найден в базе (id={doc.id})")
-                return DocumentValidationResponse(valid=True)
-            else:
-                logger.warning("❌ Документ не найден: подпись не зарегистрирована")
-                return DocumentValidationResponse(valid=False)
+            # 3. Ищем по signed_document_hash
+            return await DocumentService.verify_hash(uploaded.sha256, session)
 
         except ValueError as ve:
             logger.warning(f"⚠️ Ошибка валидации: {ve}")
@@ -157,20 +220,92 @@ class DocumentService:
             logger.error(f"❌ Неизвестная ошибка при проверке подписи: {e}")
             raise ValueError("Не удалось проверить подпись. Убедитесь, что файл корректный.")
 
+    @staticmethod
+    async def verify_hash(hash_: str, session: AsyncSession) -> DocumentValidationResponse:
+        # Фильтр Блума -> кеш результатов -> БД
+        if await DocumentRepository.is_signed_hash_registered(hash_, session):
+            logger.info(f"✅ Документ валиден: подпись зарегистрирована ({hash_})")
+            return DocumentValidationResponse(valid=True)
+
+        logger.warning(f"❌ Документ не найден: подпись не зарегистрирована ({hash_})")
+        return DocumentValidationResponse(valid=False)
+
+    @staticmethod
+    async def verify_batch(
+        session: AsyncSession,
+        files: list[UploadFile] | None = None,
+        hashes: list[str] | None = None,
+    ) -> DocumentBatchValidationResponse:
+        if bool(files) == bool(hashes):
+            raise ValueError("Передайте либо файлы, либо список хешей")
+
+        items_count = len(files or hashes or [])
+        if items_count > settings.batch_verification.max_items:
+            raise ValueError(f"Не более {settings.batch_verification.max_items} элементов за один запрос")
+
+        if hashes:
+            items = [DocumentBatchValidationItem(sha256=hash_, valid=False) for hash_ in hashes]
+        else:
+            semaphore = asyncio.Semaphore(settings.batch_verification.hash_concurrency)
+            items = list(await asyncio.gather(*(DocumentService._hash_batch_item(file, semaphore) for file in files or [])))
+
+        # Все хеши пакета разрешаются одним запросом к БД
+        registered = await DocumentRepository.are_signed_hashes_registered(
+            [item.sha256 for item in items if item.sha256 is not None], session
+        )
+        for item in items:
+            if item.sha256 is not None:
+                item.valid = registered[item.sha256]
+
+        logger.info(f"📦 Пакетная проверка: {len(items)} элементов, валидных {sum(item.valid for item in items)}")
+        return DocumentBatchValidationResponse(results=items)
+
+    @staticmethod
+    async def _hash_batch_item(file: UploadFile, semaphore: asyncio.Semaphore) -> DocumentBatchValidationItem:
+        if file.content_type != "application/pdf":
+            return DocumentBatchValidationItem(filename=file.filename, valid=False, error="Файл должен быть в формате PDF")
+
+        async with semaphore:
+            try:
+                uploaded = await UploadStream(file).drain()
+            except ValueError as e:
+                return DocumentBatchValidationItem(filename=file.filename, valid=False, error=str(e))
+
+        return DocumentBatchValidationItem(sha256=uploaded.sha256, filename=file.filename, valid=False)
+
     @classmethod
     async def get_all(
         cls,
         query_filters: DocumentFilters,
         session: AsyncSession,
     ) -> Page[DocumentGetDTO]:
-        limit, offset = page_to_limit_offset(query_filters.page, Document.__page_size__)
-        docs, total = await DocumentRepository.get_all(
-            query_filters=query_filters,
-            limit=limit,
-            offset=offset,
-            session=session,
-        )
+        page_size = Document.__page_size__
+        if query_filters.cursor is not None:
+            docs, next_cursor = await DocumentRepository.get_page_after(
+                query_filters=query_filters,
+                limit=page_size,
+                cursor=query_filters.cursor,
+                session=session,
+            )
+            total_mode = query_filters.total or "estimate"
+        else:
+            limit, offset = page_to_limit_offset(query_filters.page, page_size)
+            docs, next_cursor = await DocumentRepository.get_all(
+                query_filters=query_filters,
+                limit=limit,
+                offset=offset,
+                session=session,
+            )
+            total_mode = query_filters.total or "exact"
+
+        total_pages = None
+        if total_mode == "exact":
+            total_pages = await get_total_pages(await DocumentRepository.count(query_filters, session), page_size)
+        elif total_mode == "estimate":
+            total_pages = await get_total_pages(await DocumentRepository.estimate_count(query_filters, session), page_size)
+
         return Page(
             data=[DocumentGetDTO.model_validate(doc) for doc in docs],
-            total_pages=await get_total_pages(total, Document.__page_size__),
+            total_pages=total_pages,
+            next_cursor=next_cursor,
         )
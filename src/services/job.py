@@ -0,0 +1,75 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from conf.config import settings
+from src.integrations.logger import logger
+from src.integrations.minio import get_document_download_url
+
+from ..models.job import GenerationJobItem, JobItemStatus
+from ..on_startup.jobs import generation_job_worker
+from ..repositories.job import GenerationJobRepository
+from ..schema.base import Page
+from ..schema.info.job import (
+    GenerationBatchCreateDTO,
+    GenerationJobCreatedResponse,
+    GenerationJobFilters,
+    GenerationJobItemResult,
+    GenerationJobResponse,
+    JobStatus,
+)
+from ..utils.pagination import get_total_pages, page_to_limit_offset
+
+
+class GenerationJobService:
+    @staticmethod
+    async def create(dto: GenerationBatchCreateDTO, session: AsyncSession) -> GenerationJobCreatedResponse:
+        if len(dto.items) > settings.generation_jobs.max_items:
+            raise ValueError(f"Не более {settings.generation_jobs.max_items} документов в одном задании")
+
+        job = await GenerationJobRepository.create(session, [item.model_dump() for item in dto.items])
+        logger.info(f"📦 Создано задание генерации id={job.id} на {job.total} документов")
+
+        # Воркеры этого процесса не ждут следующего опроса очереди
+        generation_job_worker.wake()
+        return GenerationJobCreatedResponse(id=job.id, total=job.total)
+
+    @staticmethod
+    async def get(job_id: int, query_filters: GenerationJobFilters, session: AsyncSession) -> GenerationJobResponse | None:
+        job = await GenerationJobRepository.get(job_id, session)
+        if job is None:
+            return None
+
+        counts = await GenerationJobRepository.count_items_by_status(job_id, session)
+        pending = counts.get(JobItemStatus.PENDING, 0)
+        processing = counts.get(JobItemStatus.PROCESSING, 0)
+
+        status: JobStatus
+        if pending + processing == 0:
+            status = "completed"
+        elif pending == job.total:
+            status = "pending"
+        else:
+            status = "running"
+
+        page_size = GenerationJobItem.__page_size__
+        limit, offset = page_to_limit_offset(query_filters.page, page_size)
+        items = await GenerationJobRepository.get_items(job_id, limit, offset, session)
+
+        results = []
+        for item, doc in items:
+            result = GenerationJobItemResult.model_validate(item)
+            if doc is not None:
+                result.original_document_hash = doc.original_document_hash.hex()
+                result.link_to_download = await get_document_download_url(doc.original_document_path)
+            results.append(result)
+
+        return GenerationJobResponse(
+            id=job.id,
+            status=status,
+            total=job.total,
+            pending=pending,
+            processing=processing,
+            done=counts.get(JobItemStatus.DONE, 0),
+            failed=counts.get(JobItemStatus.FAILED, 0),
+            created_at=job.created_at,
+            results=Page(data=results, total_pages=await get_total_pages(job.total, page_size)),
+        )
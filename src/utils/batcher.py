@@ -0,0 +1,79 @@
+import asyncio
+from collections.abc import Awaitable, Callable, Sequence
+from typing import Generic, TypeVar
+
+from src.integrations.metrics.metrics import WRITE_BATCH_SIZE
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class MicroBatcher(Generic[T, R]):
+    """
+    Собирает элементы от одновременных запросов и отдаёт их в flush одним пакетом:
+    при накоплении max_size элементов или через max_delay секунд после первого из них.
+    flush возвращает результат на каждый элемент в том же порядке; исключение в списке
+    результатов достаётся только своему элементу, исключение из flush — всему пакету.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        flush: Callable[[list[T]], Awaitable[Sequence[R | Exception]]],
+        max_size: int,
+        max_delay: float,
+    ) -> None:
+        self.name = name
+        self.max_size = max_size
+        self.max_delay = max_delay
+        self._flush = flush
+        self._pending: list[tuple[T, asyncio.Future[R]]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._flushes: set[asyncio.Task[None]] = set()
+        self._batch_size = WRITE_BATCH_SIZE.labels(batcher=name)
+
+    async def submit(self, item: T) -> R:
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future[R] = loop.create_future()
+        self._pending.append((item, future))
+
+        if len(self._pending) >= self.max_size:
+            self._flush_pending()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_delay, self._flush_pending)
+
+        return await future
+
+    async def close(self) -> None:
+        self._flush_pending()
+        await asyncio.gather(*self._flushes, return_exceptions=True)
+
+    def _flush_pending(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.create_task(self._run(batch), name=f"{self.name}-flush")
+            self._flushes.add(task)
+            task.add_done_callback(self._flushes.discard)
+
+    async def _run(self, batch: list[tuple[T, "asyncio.Future[R]"]]) -> None:
+        self._batch_size.observe(len(batch))
+        try:
+            results = await self._flush([item for item, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            # Ожидающий мог быть отменён — его результат просто некому отдать
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
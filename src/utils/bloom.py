@@ -0,0 +1,99 @@
+import hashlib
+from collections.abc import Iterator
+from math import ceil, log
+
+from src.integrations.metrics.metrics import BLOOM_FILTER_CHECKS, BLOOM_FILTER_STATS
+
+
+class BloomFilter:
+    """
+    Классический фильтр Блума с двойным хешированием (Kirsch–Mitzenmacher).
+    Ложноотрицательных ответов не бывает, доля ложноположительных ~false_positive_rate
+    до тех пор, пока число элементов не превышает capacity.
+    """
+
+    def __init__(self, capacity: int, false_positive_rate: float) -> None:
+        self.capacity = max(capacity, 1)
+        self.false_positive_rate = false_positive_rate
+        self.bit_count = max(8, ceil(-self.capacity * log(false_positive_rate) / log(2) ** 2))
+        self.hash_count = max(1, round(self.bit_count / self.capacity * log(2)))
+        self.count = 0
+        self._bits = bytearray((self.bit_count + 7) // 8)
+
+    @property
+    def size_bytes(self) -> int:
+        return len(self._bits)
+
+    @property
+    def saturated(self) -> bool:
+        return self.count > self.capacity
+
+    def _positions(self, item: str) -> Iterator[int]:
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hash_count):
+            yield (h1 + i * h2) % self.bit_count
+
+    def add(self, item: str) -> None:
+        added = False
+        for position in self._positions(item):
+            byte, mask = position >> 3, 1 << (position & 7)
+            if not self._bits[byte] & mask:
+                self._bits[byte] |= mask
+                added = True
+        # Повторное добавление того же элемента не увеличивает счётчик
+        if added:
+            self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class BloomPrefilter:
+    """
+    Заменяемый BloomFilter с метриками.
+    Пока фильтр не построен (или сброшен), might_contain отвечает True — запросы идут в БД как обычно.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._filter: BloomFilter | None = None
+        self._absent = BLOOM_FILTER_CHECKS.labels(filter=name, result="absent")
+        self._maybe = BLOOM_FILTER_CHECKS.labels(filter=name, result="maybe")
+
+    @property
+    def ready(self) -> bool:
+        return self._filter is not None
+
+    @property
+    def saturated(self) -> bool:
+        return self._filter is not None and self._filter.saturated
+
+    def might_contain(self, item: str) -> bool:
+        if self._filter is None:
+            return True
+
+        if item in self._filter:
+            self._maybe.inc()
+            return True
+
+        self._absent.inc()
+        return False
+
+    def add(self, item: str) -> None:
+        if self._filter is not None:
+            self._filter.add(item)
+            self._export()
+
+    def replace(self, bloom: BloomFilter | None) -> None:
+        self._filter = bloom
+        self._export()
+
+    def _export(self) -> None:
+        bloom = self._filter
+        BLOOM_FILTER_STATS.labels(filter=self.name, stat="items").set(bloom.count if bloom else 0)
+        BLOOM_FILTER_STATS.labels(filter=self.name, stat="capacity").set(bloom.capacity if bloom else 0)
+        BLOOM_FILTER_STATS.labels(filter=self.name, stat="bits").set(bloom.bit_count if bloom else 0)
+        BLOOM_FILTER_STATS.labels(filter=self.name, stat="hash_functions").set(bloom.hash_count if bloom else 0)
+        BLOOM_FILTER_STATS.labels(filter=self.name, stat="memory_bytes").set(bloom.size_bytes if bloom else 0)
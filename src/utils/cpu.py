@@ -0,0 +1,49 @@
+import math
+import os
+
+from conf.config import ServerSchema
+
+# cgroup v2 и v1: квота CPU контейнера (docker --cpus, limits.cpu в Kubernetes)
+_CGROUP_V2_CPU_MAX = "/sys/fs/cgroup/cpu.max"
+_CGROUP_V1_QUOTA = "/sys/fs/cgroup/cpu/cpu.cfs_quota_us"
+_CGROUP_V1_PERIOD = "/sys/fs/cgroup/cpu/cpu.cfs_period_us"
+
+
+def _read(path: str) -> str | None:
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def _cgroup_cpu_quota() -> float | None:
+    cpu_max = _read(_CGROUP_V2_CPU_MAX)
+    if cpu_max is not None:
+        quota, _, period = cpu_max.partition(" ")
+        if quota != "max" and period:
+            return int(quota) / int(period)
+        return None
+
+    quota_v1, period_v1 = _read(_CGROUP_V1_QUOTA), _read(_CGROUP_V1_PERIOD)
+    if quota_v1 and period_v1 and int(quota_v1) > 0:
+        return int(quota_v1) / int(period_v1)
+    return None
+
+
+def available_cpus() -> int:
+    """
+    Сколько CPU реально доступно процессу: os.cpu_count() в контейнере видит все ядра хоста,
+    поэтому учитываем привязку к ядрам и квоту cgroup (округляя вверх).
+    """
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+    quota = _cgroup_cpu_quota()
+    if quota is not None:
+        cpus = min(cpus, math.ceil(quota))
+    return max(cpus, 1)
+
+
+def web_workers(config: ServerSchema) -> int:
+    if not config.multiprocess:
+        return 1
+    return config.workers or available_cpus()
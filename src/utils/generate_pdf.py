@@ -1,13 +1,52 @@
+import hashlib
+from time import perf_counter
+
+import orjson
 from fpdf import FPDF
 
+# Версия шаблона входит в отпечаток: после изменения вёрстки те же данные дают новый документ
+RENDER_VERSION = 1
+# Фиксированная дата создания для детерминированного режима
+DETERMINISTIC_CREATION_DATE = "D:20000101000000"
+
+
+class DeterministicFPDF(FPDF):  # type: ignore[misc]
+    """
+    FPDF пишет в /CreationDate текущее время, из-за чего одинаковые данные дают разные байты.
+    Здесь метаданные фиксированы: одинаковый payload -> побайтно одинаковый PDF -> одинаковый хеш.
+    """
+
+    def _putinfo(self) -> None:
+        self._out("/Producer " + self._textstring("DocVerify"))
+        self._out("/CreationDate " + self._textstring(DETERMINISTIC_CREATION_DATE))
+
+
+def payload_fingerprint(data: dict) -> str:  # type: ignore
+    # Канонический JSON: порядок ключей не влияет на отпечаток
+    canonical = orjson.dumps({"render_version": RENDER_VERSION, "payload": data}, option=orjson.OPT_SORT_KEYS)
+    return hashlib.sha256(canonical).hexdigest()
+
 
 # Mock
-def generate_pdf_from_data(data: dict, output_path: str) -> None:  # type: ignore
-    pdf = FPDF()
+def generate_pdf_from_data(data: dict, deterministic: bool = False) -> bytes:  # type: ignore
+    pdf = DeterministicFPDF() if deterministic else FPDF()
     pdf.add_page()
     pdf.set_font("Arial", size=12)
 
     for key, value in data.items():
         pdf.cell(200, 10, txt=f"{key}: {value}", ln=True)
 
-    pdf.output(output_path)
+    # dest="S" собирает документ в памяти; fpdf 1.x отдаёт его строкой latin-1
+    document: str = pdf.output(dest="S")
+    return document.encode("latin-1")
+
+
+def timed_generate_pdf_from_data(data: dict, deterministic: bool = False) -> tuple[bytes, float]:  # type: ignore
+    start_time = perf_counter()
+    document = generate_pdf_from_data(data, deterministic)
+    return document, perf_counter() - start_time
+
+
+def warm_up() -> None:
+    # Инициализатор процесса пула: метрики шрифтов загружаются один раз, до первого запроса
+    generate_pdf_from_data({"warm-up": ""})
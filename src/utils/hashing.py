@@ -0,0 +1,92 @@
+import asyncio
+import hashlib
+import mmap
+import os
+from collections.abc import AsyncIterable, Iterable
+from typing import Union
+
+# Буферы, которые можно хешировать без копирования
+Buffer = Union[bytes, bytearray, memoryview, mmap.mmap]
+
+DEFAULT_ALGORITHMS: tuple[str, ...] = ("sha256",)
+# С этого размера update() уходит в поток: hashlib отпускает GIL на больших буферах,
+# а цена перехода в поток (~100 мкс) становится меньше времени, на которое иначе блокируется loop.
+# Обоснование порога — scripts/benchmarks/hashing.py
+OFFLOAD_THRESHOLD = 256 * 1024
+MIN_CHUNK_SIZE = 64 * 1024
+MAX_CHUNK_SIZE = 4 * 1024 * 1024
+# Адаптивный чанк: примерно столько чтений на файл, но в пределах [MIN_CHUNK_SIZE, MAX_CHUNK_SIZE]
+TARGET_CHUNKS = 16
+
+
+def adaptive_chunk_size(total_size: int | None) -> int:
+    """
+    Размер чанка под размер данных: мелкие файлы читаются небольшими порциями,
+    крупные — порциями до MAX_CHUNK_SIZE, чтобы число await'ов не росло линейно.
+    """
+    if total_size is None or total_size < 0:
+        return MIN_CHUNK_SIZE
+
+    chunk_size = MIN_CHUNK_SIZE
+    while chunk_size < MAX_CHUNK_SIZE and chunk_size * TARGET_CHUNKS < total_size:
+        chunk_size *= 2
+    return chunk_size
+
+
+class MultiHasher:
+    """
+    Несколько дайджестов за один проход по данным (например, sha256 + blake2b для будущей миграции).
+    """
+
+    def __init__(self, algorithms: Iterable[str] = DEFAULT_ALGORITHMS) -> None:
+        self._hashes = {name: hashlib.new(name) for name in algorithms}
+
+    def update(self, data: Buffer) -> None:
+        for hash_ in self._hashes.values():
+            hash_.update(data)
+
+    async def update_async(self, data: Buffer) -> None:
+        if len(data) >= OFFLOAD_THRESHOLD:
+            await asyncio.to_thread(self.update, data)
+        else:
+            self.update(data)
+
+    def hexdigest(self, algorithm: str = "sha256") -> str:
+        return self._hashes[algorithm].hexdigest()
+
+    def hexdigests(self) -> dict[str, str]:
+        return {name: hash_.hexdigest() for name, hash_ in self._hashes.items()}
+
+
+def hash_bytes(data: Buffer, algorithms: Iterable[str] = DEFAULT_ALGORITHMS) -> dict[str, str]:
+    hasher = MultiHasher(algorithms)
+    hasher.update(memoryview(data))
+    return hasher.hexdigests()
+
+
+async def hash_buffer(data: Buffer, algorithms: Iterable[str] = DEFAULT_ALGORITHMS) -> dict[str, str]:
+    # Весь буфер уже в памяти — один переход в поток вместо перехода на каждый чанк
+    if len(data) >= OFFLOAD_THRESHOLD:
+        return await asyncio.to_thread(hash_bytes, data, tuple(algorithms))
+    return hash_bytes(data, algorithms)
+
+
+async def hash_stream(chunks: AsyncIterable[Buffer], algorithms: Iterable[str] = DEFAULT_ALGORITHMS) -> dict[str, str]:
+    hasher = MultiHasher(algorithms)
+    async for chunk in chunks:
+        await hasher.update_async(chunk)
+    return hasher.hexdigests()
+
+
+def hash_file_sync(path: str | os.PathLike[str], algorithms: Iterable[str] = DEFAULT_ALGORITHMS) -> dict[str, str]:
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            # mmap не умеет отображать пустой файл
+            return hash_bytes(b"", algorithms)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return hash_bytes(mapped, algorithms)
+
+
+async def hash_file(path: str | os.PathLike[str], algorithms: Iterable[str] = DEFAULT_ALGORITHMS) -> dict[str, str]:
+    # Файл отображается в память и хешируется целиком в потоке: ни одного чтения на event loop
+    return await asyncio.to_thread(hash_file_sync, path, tuple(algorithms))
@@ -0,0 +1,78 @@
+from dataclasses import dataclass
+
+from fastapi import UploadFile
+
+from src.integrations.metrics.metrics import stage_timer
+from src.utils.hashing import MultiHasher, adaptive_chunk_size
+
+# Сигнатура, с которой начинается любой PDF-файл
+PDF_MAGIC = b"%PDF-"
+
+
+class UploadAbortedError(Exception):
+    """Чтение UploadStream остановлено через abort()."""
+
+
+@dataclass(slots=True)
+class IngestedUpload:
+    sha256: str
+    size: int
+
+
+class UploadStream:
+    """
+    Однопроходное чтение UploadFile: чанки по размеру файла, инкрементальный SHA-256
+    (крупные чанки хешируются вне event loop) и проверка сигнатуры PDF на первом чанке.
+    Поддерживает асинхронный read(), поэтому те же чанки можно сразу отдавать в put_object MinIO.
+    abort() останавливает чтение: следующий read() падает с UploadAbortedError, не трогая UploadFile.
+    """
+
+    def __init__(self, upload: UploadFile, chunk_size: int | None = None) -> None:
+        self._upload = upload
+        self._chunk_size = chunk_size or adaptive_chunk_size(upload.size)
+        self._hasher = MultiHasher()
+        self._size = 0
+        self._aborted = False
+
+    @property
+    def length(self) -> int:
+        # -1 означает, что размер заранее неизвестен (MinIO загрузит файл по частям).
+        # Пустой файл тоже читается до конца: иначе MinIO не вызовет read() и проверка PDF не сработает
+        return self._upload.size if self._upload.size else -1
+
+    @property
+    def sha256(self) -> str:
+        return self._hasher.hexdigest()
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def abort(self) -> None:
+        self._aborted = True
+
+    async def read(self, size: int = -1) -> bytes:
+        if self._aborted:
+            raise UploadAbortedError("Чтение загрузки остановлено")
+        with stage_timer("upload_read"):
+            chunk = await self._upload.read(size if size > 0 else self._chunk_size)
+        # Чанк, дочитанный уже после abort(), никуда не отдаём
+        if self._aborted:
+            raise UploadAbortedError("Чтение загрузки остановлено")
+        if not chunk:
+            if self._size == 0:
+                raise ValueError("Файл не является PDF-документом")
+            return chunk
+
+        if self._size == 0 and not chunk.startswith(PDF_MAGIC):
+            raise ValueError("Файл не является PDF-документом")
+
+        with stage_timer("hash"):
+            await self._hasher.update_async(chunk)
+        self._size += len(chunk)
+        return chunk
+
+    async def drain(self) -> IngestedUpload:
+        while await self.read():
+            pass
+        return IngestedUpload(sha256=self.sha256, size=self.size)
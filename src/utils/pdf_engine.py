@@ -0,0 +1,89 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any
+
+from conf.config import PdfEngineSchema, settings
+from src.integrations.logger import logger
+from src.integrations.metrics.metrics import (
+    PDF_RENDER_IN_FLIGHT,
+    PDF_RENDER_LATENCY,
+    PDF_RENDER_REJECTED,
+    async_stage_timer,
+)
+from src.utils.cpu import available_cpus, web_workers
+from src.utils.generate_pdf import timed_generate_pdf_from_data, warm_up
+
+
+class PdfEngineOverloadedError(Exception):
+    def __init__(self, retry_after: int) -> None:
+        super().__init__("Очередь генерации PDF переполнена")
+        self.retry_after = retry_after
+
+
+class PdfRenderEngine:
+    """
+    Генерация PDF в пуле процессов: FPDF — чистый Python и не должен делить GIL с event loop.
+    Очередь ограничена: сверх workers + max_queue задач запрос сразу отклоняется.
+    """
+
+    def __init__(self, config: PdfEngineSchema) -> None:
+        self.config = config
+        self.workers = config.workers or max(available_cpus() // web_workers(settings.server), 1)
+        self.capacity = self.workers + config.max_queue
+        self._executor: ProcessPoolExecutor | None = None
+        self._in_flight = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn, а не fork: родитель многопоточный (event loop, драйверы БД)
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=warm_up,
+            )
+        return self._executor
+
+    async def start(self) -> None:
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        # Поднимаем и прогреваем все процессы заранее, чтобы первый запрос не платил за spawn
+        await asyncio.gather(*(loop.run_in_executor(executor, os.getpid) for _ in range(self.workers)))
+        logger.info(f"🖨️ Пул генерации PDF запущен: {self.workers} процессов")
+
+    async def close(self) -> None:
+        if self._executor is not None:
+            await asyncio.to_thread(self._executor.shutdown, wait=True, cancel_futures=True)
+            self._executor = None
+
+    @async_stage_timer
+    async def render(self, data: dict[str, Any]) -> bytes:
+        if self._in_flight >= self.capacity:
+            PDF_RENDER_REJECTED.inc()
+            raise PdfEngineOverloadedError(self.config.retry_after)
+
+        self._in_flight += 1
+        self._export()
+        try:
+            loop = asyncio.get_running_loop()
+            document, duration = await loop.run_in_executor(
+                self._get_executor(), timed_generate_pdf_from_data, data, self.config.deterministic
+            )
+            PDF_RENDER_LATENCY.observe(duration)
+            return document
+        except BrokenProcessPool:
+            # Процесс пула упал: следующий запрос поднимет новый пул
+            self._executor = None
+            raise
+        finally:
+            self._in_flight -= 1
+            self._export()
+
+    def _export(self) -> None:
+        PDF_RENDER_IN_FLIGHT.labels(state="running").set(min(self._in_flight, self.workers))
+        PDF_RENDER_IN_FLIGHT.labels(state="queued").set(max(self._in_flight - self.workers, 0))
+
+
+pdf_engine = PdfRenderEngine(settings.pdf_engine)
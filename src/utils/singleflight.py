@@ -0,0 +1,41 @@
+import asyncio
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Generic, TypeVar
+
+from src.integrations.metrics.metrics import SINGLE_FLIGHT_CALLS
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class SingleFlight(Generic[K, V]):
+    """
+    Схлопывает одновременные вызовы с одинаковым ключом в одно выполнение.
+    Вызов идёт отдельной задачей: отмена одного из ожидающих (например, клиент отключился)
+    не отменяет работу для остальных.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._calls: dict[K, asyncio.Task[V]] = {}
+        self._leaders = SINGLE_FLIGHT_CALLS.labels(group=name, role="leader")
+        self._followers = SINGLE_FLIGHT_CALLS.labels(group=name, role="follower")
+
+    async def do(self, key: K, call: Callable[[], Awaitable[V]]) -> V:
+        task = self._calls.get(key)
+        if task is None:
+            self._leaders.inc()
+            task = asyncio.ensure_future(call())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            self._followers.inc()
+
+        return await asyncio.shield(task)
+
+    def _forget(self, key: K, task: "asyncio.Task[V]") -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Забираем исключение, даже если все ожидающие уже отменены
+        if not task.cancelled():
+            task.exception()
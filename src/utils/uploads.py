@@ -0,0 +1,181 @@
+import asyncio
+import os
+from collections.abc import Callable, Coroutine
+from tempfile import SpooledTemporaryFile
+from typing import Any
+
+from fastapi import HTTPException
+from fastapi.routing import APIRoute
+from python_multipart.multipart import parse_options_header
+from starlette.datastructures import FormData, Headers
+from starlette.formparsers import MultiPartException, MultiPartParser
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from conf.config import UploadsSchema, settings
+from src.integrations.metrics.metrics import UPLOAD_INFLIGHT_BYTES, UPLOAD_REJECTED
+
+
+def ensure_spool_dir(config: UploadsSchema) -> None:
+    if config.spool_dir:
+        os.makedirs(config.spool_dir, exist_ok=True)
+
+
+class SpoolingMultiPartParser(MultiPartParser):
+    """
+    MultiPartParser с собственными настройками спулинга: каждый файл держится в памяти
+    до spool_max_size байт, дальше пишется во временный файл в spool_dir (можно указать tmpfs).
+    Глобальные tempfile.tempdir и атрибуты MultiPartParser не меняются.
+    """
+
+    def __init__(self, *args: Any, config: UploadsSchema, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.spool_max_size = config.spool_max_size
+        self.spool_dir = config.spool_dir
+
+    def on_headers_finished(self) -> None:
+        super().on_headers_finished()
+        upload = self._current_part.file
+        if upload is not None and self.spool_dir is not None:
+            # Файл только что создан и ещё пуст — подменяем его файлом в нужном каталоге
+            spooled = SpooledTemporaryFile(max_size=self.spool_max_size, dir=self.spool_dir)
+            self._files_to_close_on_error[-1] = spooled
+            upload.file = spooled  # type: ignore[assignment]
+
+
+class SpoolingRequest(Request):
+    """
+    Request, разбирающий multipart-форму через SpoolingMultiPartParser.
+    Временные файлы SpooledTemporaryFile удаляются из каталога сразу при создании
+    и освобождаются при закрытии загрузки после ответа, поэтому на диске ничего не остаётся.
+    """
+
+    async def _get_form(
+        self,
+        *,
+        max_files: int | float = 1000,
+        max_fields: int | float = 1000,
+        max_part_size: int = 1024 * 1024,
+    ) -> FormData:
+        if self._form is None:
+            content_type, _ = parse_options_header(self.headers.get("Content-Type"))
+            if content_type != b"multipart/form-data":
+                return await super()._get_form(max_files=max_files, max_fields=max_fields, max_part_size=max_part_size)
+
+            parser = SpoolingMultiPartParser(
+                self.headers,
+                self.stream(),
+                max_files=max_files,
+                max_fields=max_fields,
+                max_part_size=max_part_size,
+                config=settings.uploads,
+            )
+            try:
+                self._form = await parser.parse()
+            except MultiPartException as exc:
+                raise HTTPException(status_code=400, detail=exc.message)
+        return self._form
+
+
+class SpoolingRoute(APIRoute):
+    """
+    Маршрут с SpoolingRequest: настройки спулинга действуют только на формы этого роутера.
+    """
+
+    def get_route_handler(self) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        handler = super().get_route_handler()
+
+        async def spooling_handler(request: Request) -> Response:
+            return await handler(SpoolingRequest(request.scope, request.receive))
+
+        return spooling_handler
+
+
+class UploadBudget:
+    """
+    Общий для всех запросов процесса бюджет байт загрузок в обработке.
+    Байты резервируются по мере получения тела и освобождаются по завершении запроса.
+    """
+
+    def __init__(self, limit: int) -> None:
+        self.limit = limit
+        self._in_flight = 0
+        self._condition = asyncio.Condition()
+
+    async def acquire(self, size: int, timeout: float) -> bool:
+        async with self._condition:
+            try:
+                async with asyncio.timeout(timeout):
+                    await self._condition.wait_for(lambda: self._in_flight + size <= self.limit)
+            except TimeoutError:
+                return False
+            self._in_flight += size
+            UPLOAD_INFLIGHT_BYTES.set(self._in_flight)
+            return True
+
+    async def release(self, size: int) -> None:
+        async with self._condition:
+            self._in_flight -= size
+            UPLOAD_INFLIGHT_BYTES.set(self._in_flight)
+            self._condition.notify_all()
+
+
+class UploadLimitMiddleware:
+    """
+    Ограничения multipart-загрузок: максимальный размер тела (413 ещё до чтения, если известен
+    Content-Length, иначе как только поток превысит лимит) и общий бюджет байт в обработке
+    (503 с Retry-After, если место под очередной чанк не освободилось за budget_wait секунд).
+    """
+
+    def __init__(self, app: ASGIApp, config: UploadsSchema) -> None:
+        self.app = app
+        self.config = config
+        self.budget = UploadBudget(config.inflight_budget)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        if not headers.get("content-type", "").startswith("multipart/form-data"):
+            await self.app(scope, receive, send)
+            return
+
+        max_size = self.config.max_size
+        content_length = headers.get("content-length")
+        if content_length and content_length.isdigit() and int(content_length) > max_size:
+            UPLOAD_REJECTED.labels(reason="too_large").inc()
+            response = JSONResponse({"detail": f"Размер загрузки превышает {max_size} байт"}, status_code=413)
+            await response(scope, receive, send)
+            return
+
+        reserved = 0
+
+        async def limited_receive() -> Message:
+            nonlocal reserved
+            message = await receive()
+            if message["type"] != "http.request":
+                return message
+
+            size = len(message.get("body", b""))
+            # HTTPException из разбора тела FastAPI пробрасывает как есть — клиент получит 413/503
+            if reserved + size > max_size:
+                UPLOAD_REJECTED.labels(reason="too_large").inc()
+                raise HTTPException(status_code=413, detail=f"Размер загрузки превышает {max_size} байт")
+            if size and not await self.budget.acquire(size, self.config.budget_wait):
+                UPLOAD_REJECTED.labels(reason="budget").inc()
+                raise HTTPException(
+                    status_code=503,
+                    detail="Сервер обрабатывает слишком много загрузок",
+                    headers={"Retry-After": str(self.config.retry_after)},
+                )
+            reserved += size
+            return message
+
+        try:
+            await self.app(scope, limited_receive, send)
+        finally:
+            if reserved:
+                await self.budget.release(reserved)
@@ -0,0 +1,26 @@
+import os
+
+import pytest
+
+# conf.config читает настройки при импорте: обязательным полям нужны значения,
+# сами Postgres и MinIO тестам не нужны — соединения не открываются
+for _name, _value in {
+    "POSTGRES__USER": "test",
+    "POSTGRES__PASSWORD": "test",
+    "POSTGRES__DATABASE": "test",
+    "POSTGRES__HOST": "localhost",
+    "POSTGRES__PORT": "5432",
+    "MINIO__LOGIN": "test",
+    "MINIO__PASSWORD": "test",
+    "MINIO__PORT": "9000",
+    "MINIO__DOCS_BUCKET": "docs",
+    "MINIO__CONTAINER_ENDPOINT": "localhost:9000",
+    "MINIO__OUTSIDE_ENDPOINT": "localhost:9000",
+}.items():
+    os.environ.setdefault(_name, _value)
+
+
+@pytest.fixture
+def anyio_backend() -> str:
+    # Приложение работает только поверх asyncio
+    return "asyncio"
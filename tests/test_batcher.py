@@ -0,0 +1,182 @@
+import asyncio
+from typing import Any
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from src.repositories import doc as doc_repository
+from src.utils.batcher import MicroBatcher
+
+
+class Recorder:
+    def __init__(self) -> None:
+        self.batches: list[list[int]] = []
+
+    async def __call__(self, items: list[int]) -> list[int | Exception]:
+        self.batches.append(items)
+        return [ValueError(f"odd {item}") if item % 2 else item * 10 for item in items]
+
+
+@pytest.mark.anyio
+async def test_flushes_when_batch_is_full() -> None:
+    flush = Recorder()
+    batcher: MicroBatcher[int, int] = MicroBatcher(name="test", flush=flush, max_size=2, max_delay=60)
+
+    assert await asyncio.gather(batcher.submit(2), batcher.submit(4)) == [20, 40]
+    assert flush.batches == [[2, 4]]
+
+
+@pytest.mark.anyio
+async def test_flushes_partial_batch_after_delay() -> None:
+    flush = Recorder()
+    batcher: MicroBatcher[int, int] = MicroBatcher(name="test", flush=flush, max_size=100, max_delay=0.01)
+
+    assert await asyncio.wait_for(batcher.submit(2), timeout=1) == 20
+    assert flush.batches == [[2]]
+
+
+@pytest.mark.anyio
+async def test_item_exception_reaches_only_its_submitter() -> None:
+    batcher: MicroBatcher[int, int] = MicroBatcher(name="test", flush=Recorder(), max_size=3, max_delay=60)
+
+    results = await asyncio.gather(batcher.submit(2), batcher.submit(3), batcher.submit(4), return_exceptions=True)
+
+    assert results[0] == 20
+    assert isinstance(results[1], ValueError)
+    assert results[2] == 40
+
+
+@pytest.mark.anyio
+async def test_flush_exception_reaches_whole_batch() -> None:
+    async def flush(items: list[int]) -> list[int | Exception]:
+        raise ConnectionError("database is down")
+
+    batcher: MicroBatcher[int, int] = MicroBatcher(name="test", flush=flush, max_size=2, max_delay=60)
+
+    results = await asyncio.gather(batcher.submit(1), batcher.submit(2), return_exceptions=True)
+
+    assert all(isinstance(result, ConnectionError) for result in results)
+
+
+@pytest.mark.anyio
+async def test_cancelled_submitter_does_not_break_batch() -> None:
+    flush = Recorder()
+    batcher: MicroBatcher[int, int] = MicroBatcher(name="test", flush=flush, max_size=100, max_delay=0.01)
+
+    cancelled = asyncio.create_task(batcher.submit(2))
+    await asyncio.sleep(0)
+    cancelled.cancel()
+
+    assert await batcher.submit(4) == 40
+    assert flush.batches == [[2, 4]]
+
+
+@pytest.mark.anyio
+async def test_close_flushes_pending_items() -> None:
+    flush = Recorder()
+    batcher: MicroBatcher[int, int] = MicroBatcher(name="test", flush=flush, max_size=100, max_delay=60)
+
+    pending = asyncio.create_task(batcher.submit(2))
+    await asyncio.sleep(0)
+    await batcher.close()
+
+    assert await pending == 20
+
+
+def duplicate_error() -> IntegrityError:
+    return IntegrityError("INSERT INTO docs", {}, Exception("duplicate key value violates unique constraint"))
+
+
+class FakeResult:
+    def __init__(self, docs: list[dict[str, Any]]) -> None:
+        self._docs = docs
+
+    def scalars(self) -> "FakeResult":
+        return self
+
+    def all(self) -> list[dict[str, Any]]:
+        return self._docs
+
+    def scalar_one(self) -> dict[str, Any]:
+        (doc,) = self._docs
+        return doc
+
+
+class FakeDatabase:
+    """Вместо Postgres: строки с уже занятым хешем дают IntegrityError, как уникальный индекс."""
+
+    def __init__(self, taken: set[bytes]) -> None:
+        self.taken = taken
+        self.statements: list[int] = []
+        self.commits = 0
+        self.rollbacks = 0
+
+    def __call__(self) -> "FakeSession":
+        return FakeSession(self)
+
+
+class FakeSession:
+    def __init__(self, database: FakeDatabase) -> None:
+        self.database = database
+
+    async def __aenter__(self) -> "FakeSession":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        pass
+
+    async def execute(self, statement: Any, rows: list[dict[str, Any]] | None = None) -> FakeResult:
+        if rows is None:
+            # Построчная вставка: insert(...).values(**row)
+            rows = [dict(statement.compile().params)]
+        self.database.statements.append(len(rows))
+        if any(row["original_document_hash"] in self.database.taken for row in rows):
+            raise duplicate_error()
+        return FakeResult(rows)
+
+    async def commit(self) -> None:
+        self.database.commits += 1
+
+    async def rollback(self) -> None:
+        self.database.rollbacks += 1
+
+
+def document_row(digest: int) -> dict[str, Any]:
+    return {
+        "original_document_hash": bytes([digest]) * 32,
+        "original_document_path": f"{digest}.pdf",
+        "is_signed": False,
+        "payload_fingerprint": None,
+    }
+
+
+@pytest.mark.anyio
+async def test_insert_documents_uses_one_statement_per_batch(monkeypatch: pytest.MonkeyPatch) -> None:
+    database = FakeDatabase(taken=set())
+    monkeypatch.setattr(doc_repository, "async_session", database)
+    rows = [document_row(1), document_row(2)]
+
+    results = await doc_repository._insert_documents(rows)
+
+    assert results == rows
+    assert database.statements == [2]
+    assert database.commits == 1
+
+
+@pytest.mark.anyio
+async def test_insert_documents_falls_back_to_rows_on_duplicate(monkeypatch: pytest.MonkeyPatch) -> None:
+    duplicate = document_row(2)
+    database = FakeDatabase(taken={duplicate["original_document_hash"]})
+    monkeypatch.setattr(doc_repository, "async_session", database)
+    rows = [document_row(1), duplicate, document_row(3)]
+
+    results = await doc_repository._insert_documents(rows)
+
+    # Пакет откатывается целиком, затем каждая строка вставляется в своей транзакции:
+    # дубликат получает свой IntegrityError, остальные строки сохраняются
+    assert results[0] == rows[0]
+    assert isinstance(results[1], IntegrityError)
+    assert results[2] == rows[2]
+    assert database.statements == [3, 1, 1, 1]
+    assert database.commits == 2
+    assert database.rollbacks == 2
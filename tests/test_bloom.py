@@ -0,0 +1,127 @@
+from collections.abc import AsyncIterator, Iterator
+from typing import Any
+
+import pytest
+
+from src.on_startup import bloom as bloom_sync
+from src.repositories.doc import signed_hash_prefilter, verification_cache
+from src.utils.bloom import BloomFilter, BloomPrefilter
+
+SIGNED = "aa" * 32
+UNKNOWN = "bb" * 32
+NOTIFIED = "cc" * 32
+
+
+@pytest.fixture(autouse=True)
+def reset_shared_state() -> Iterator[None]:
+    signed_hash_prefilter.replace(None)
+    verification_cache.clear()
+    yield
+    signed_hash_prefilter.replace(None)
+    verification_cache.clear()
+
+
+def test_bloom_filter_has_no_false_negatives() -> None:
+    bloom = BloomFilter(capacity=1000, false_positive_rate=0.01)
+    items = [f"{i:064x}" for i in range(1000)]
+    for item in items:
+        bloom.add(item)
+
+    assert all(item in bloom for item in items)
+    assert not bloom.saturated
+
+
+def test_bloom_filter_counts_repeated_items_once() -> None:
+    bloom = BloomFilter(capacity=1, false_positive_rate=0.01)
+    bloom.add(SIGNED)
+    bloom.add(SIGNED)
+
+    assert bloom.count == 1
+    assert not bloom.saturated
+
+    bloom.add(UNKNOWN)
+    assert bloom.saturated
+
+
+def test_prefilter_passes_everything_until_ready() -> None:
+    prefilter = BloomPrefilter(name="test")
+
+    assert not prefilter.ready
+    assert prefilter.might_contain(UNKNOWN)
+    # Добавление в несобранный фильтр ничего не делает и не падает
+    prefilter.add(SIGNED)
+
+    prefilter.replace(BloomFilter(capacity=100, false_positive_rate=0.001))
+    assert prefilter.ready
+    assert not prefilter.might_contain(UNKNOWN)
+
+    prefilter.add(SIGNED)
+    assert prefilter.might_contain(SIGNED)
+
+    # Сброс (например, при потере LISTEN) снова пропускает все запросы в БД
+    prefilter.replace(None)
+    assert not prefilter.ready
+    assert prefilter.might_contain(UNKNOWN)
+
+
+def test_notify_refreshes_prefilter_and_negative_cache_entry() -> None:
+    signed_hash_prefilter.replace(BloomFilter(capacity=100, false_positive_rate=0.001))
+    verification_cache.set(NOTIFIED, False, ttl=60)
+
+    bloom_sync.SignedHashFilterSync()._on_notify(None, 0, bloom_sync.SIGNED_HASHES_CHANNEL, NOTIFIED)
+
+    assert signed_hash_prefilter.might_contain(NOTIFIED)
+    assert verification_cache.get(NOTIFIED) is True
+
+
+class FakeSession:
+    async def __aenter__(self) -> "FakeSession":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        pass
+
+
+@pytest.mark.anyio
+async def test_rebuild_keeps_hashes_notified_while_streaming(monkeypatch: pytest.MonkeyPatch) -> None:
+    sync = bloom_sync.SignedHashFilterSync()
+
+    async def count_signed(session: FakeSession) -> int:
+        return 1
+
+    async def stream_signed_hashes(session: FakeSession) -> AsyncIterator[str]:
+        yield SIGNED
+        # Подпись закоммичена после того, как чтение таблицы уже прошло нужное место
+        sync._on_notify(None, 0, bloom_sync.SIGNED_HASHES_CHANNEL, NOTIFIED)
+
+    monkeypatch.setattr(bloom_sync, "async_session", FakeSession)
+    monkeypatch.setattr(bloom_sync.DocumentRepository, "count_signed", count_signed)
+    monkeypatch.setattr(bloom_sync.DocumentRepository, "stream_signed_hashes", stream_signed_hashes)
+
+    await sync.rebuild()
+
+    assert signed_hash_prefilter.ready
+    assert signed_hash_prefilter.might_contain(SIGNED)
+    assert signed_hash_prefilter.might_contain(NOTIFIED)
+    assert not signed_hash_prefilter.might_contain(UNKNOWN)
+    assert sync._pending is None
+
+
+@pytest.mark.anyio
+async def test_failed_rebuild_keeps_previous_filter(monkeypatch: pytest.MonkeyPatch) -> None:
+    previous = BloomFilter(capacity=100, false_positive_rate=0.001)
+    previous.add(SIGNED)
+    signed_hash_prefilter.replace(previous)
+    sync = bloom_sync.SignedHashFilterSync()
+
+    async def count_signed(session: FakeSession) -> int:
+        raise ConnectionError("connection lost")
+
+    monkeypatch.setattr(bloom_sync, "async_session", FakeSession)
+    monkeypatch.setattr(bloom_sync.DocumentRepository, "count_signed", count_signed)
+
+    with pytest.raises(ConnectionError):
+        await sync.rebuild()
+
+    assert signed_hash_prefilter.might_contain(SIGNED)
+    assert sync._pending is None
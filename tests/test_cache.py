@@ -0,0 +1,93 @@
+import pytest
+
+from src.utils import cache
+from src.utils.cache import TTLCache
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> Clock:
+    clock = Clock()
+    monkeypatch.setattr(cache, "monotonic", clock)
+    return clock
+
+
+def test_entry_expires_after_ttl(clock: Clock) -> None:
+    entries: TTLCache[str, bool] = TTLCache(name="test", max_size=10, ttl=60)
+    entries.set("a", True)
+
+    clock.now += 59
+    assert entries.get("a") is True
+
+    clock.now += 1
+    assert entries.get("a") is None
+    assert len(entries) == 0
+
+
+def test_negative_entry_is_a_hit_until_its_own_ttl(clock: Clock) -> None:
+    entries: TTLCache[str, bool] = TTLCache(name="test", max_size=10, ttl=3600)
+    entries.set("a", False, ttl=60)
+
+    # False — закешированный отрицательный ответ, а не промах
+    assert entries.get("a") is False
+
+    clock.now += 60
+    assert entries.get("a") is None
+
+
+def test_positive_answer_overwrites_negative_entry(clock: Clock) -> None:
+    entries: TTLCache[str, bool] = TTLCache(name="test", max_size=10, ttl=3600)
+    entries.set("a", False, ttl=60)
+    entries.set("a", True)
+
+    # Новая запись получает свой TTL, а не остаток отрицательного
+    clock.now += 61
+    assert entries.get("a") is True
+
+
+def test_evicts_least_recently_used(clock: Clock) -> None:
+    entries: TTLCache[str, int] = TTLCache(name="test", max_size=2, ttl=60)
+    entries.set("a", 1)
+    entries.set("b", 2)
+    # Чтение делает "a" самой свежей записью
+    assert entries.get("a") == 1
+
+    entries.set("c", 3)
+
+    assert entries.get("b") is None
+    assert entries.get("a") == 1
+    assert entries.get("c") == 3
+    assert len(entries) == 2
+
+
+def test_set_refreshes_recency_without_growing(clock: Clock) -> None:
+    entries: TTLCache[str, int] = TTLCache(name="test", max_size=2, ttl=60)
+    entries.set("a", 1)
+    entries.set("b", 2)
+    entries.set("a", 10)
+
+    entries.set("c", 3)
+
+    assert entries.get("a") == 10
+    assert entries.get("b") is None
+
+
+def test_invalidate_and_clear(clock: Clock) -> None:
+    entries: TTLCache[str, int] = TTLCache(name="test", max_size=10, ttl=60)
+    entries.set("a", 1)
+    entries.set("b", 2)
+
+    entries.invalidate("a")
+    entries.invalidate("missing")
+    assert entries.get("a") is None
+    assert entries.get("b") == 2
+
+    entries.clear()
+    assert len(entries) == 0
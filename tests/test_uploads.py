@@ -0,0 +1,161 @@
+import asyncio
+from typing import Any
+
+import pytest
+from fastapi import FastAPI, Request
+from starlette.types import Message
+
+from conf.config import UploadsSchema
+from src.utils.uploads import UploadBudget, UploadLimitMiddleware
+
+MULTIPART = "multipart/form-data; boundary=test"
+
+
+def create_app(config: UploadsSchema) -> tuple[UploadLimitMiddleware, list[int]]:
+    received: list[int] = []
+    app = FastAPI()
+
+    @app.post("/upload")
+    async def upload(request: Request) -> dict[str, int]:
+        body = await request.body()
+        received.append(len(body))
+        return {"size": len(body)}
+
+    return UploadLimitMiddleware(app, config), received
+
+
+async def post(
+    app: UploadLimitMiddleware,
+    chunks: list[bytes],
+    content_type: str = MULTIPART,
+    content_length: int | None = None,
+) -> tuple[int, dict[str, str]]:
+    headers = [(b"content-type", content_type.encode())]
+    if content_length is not None:
+        headers.append((b"content-length", str(content_length).encode()))
+    scope: dict[str, Any] = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": "/upload",
+        "raw_path": b"/upload",
+        "root_path": "",
+        "query_string": b"",
+        "headers": headers,
+        "client": ("127.0.0.1", 1234),
+        "server": ("testserver", 80),
+    }
+    messages = [{"type": "http.request", "body": chunk, "more_body": i < len(chunks) - 1} for i, chunk in enumerate(chunks)]
+    sent: list[Message] = []
+
+    async def receive() -> Message:
+        if messages:
+            return messages.pop(0)
+        return {"type": "http.disconnect"}
+
+    async def send(message: Message) -> None:
+        sent.append(message)
+
+    await app(scope, receive, send)
+    start = next(message for message in sent if message["type"] == "http.response.start")
+    return start["status"], {key.decode(): value.decode() for key, value in start["headers"]}
+
+
+@pytest.mark.anyio
+async def test_budget_acquire_times_out_when_exhausted() -> None:
+    budget = UploadBudget(limit=10)
+
+    assert await budget.acquire(8, timeout=0)
+    assert not await budget.acquire(3, timeout=0.01)
+    assert await budget.acquire(2, timeout=0)
+
+
+@pytest.mark.anyio
+async def test_budget_release_wakes_waiter() -> None:
+    budget = UploadBudget(limit=10)
+    await budget.acquire(8, timeout=0)
+
+    waiter = asyncio.create_task(budget.acquire(5, timeout=1))
+    await asyncio.sleep(0.01)
+    assert not waiter.done()
+
+    await budget.release(8)
+    assert await waiter
+    assert budget._in_flight == 5
+
+
+@pytest.mark.anyio
+async def test_accepted_upload_releases_budget() -> None:
+    app, received = create_app(UploadsSchema(max_size=100, inflight_budget=100))
+
+    status, _ = await post(app, [b"a" * 30, b"b" * 30])
+
+    assert status == 200
+    assert received == [60]
+    assert app.budget._in_flight == 0
+
+
+@pytest.mark.anyio
+async def test_content_length_over_limit_is_rejected_before_reading() -> None:
+    app, received = create_app(UploadsSchema(max_size=100))
+
+    status, _ = await post(app, [b"a" * 200], content_length=200)
+
+    assert status == 413
+    assert received == []
+    assert app.budget._in_flight == 0
+
+
+@pytest.mark.anyio
+async def test_stream_over_limit_is_rejected_and_budget_released() -> None:
+    app, received = create_app(UploadsSchema(max_size=100, inflight_budget=1000))
+
+    # Без Content-Length лимит срабатывает на чанке, который его превышает
+    status, _ = await post(app, [b"a" * 60, b"b" * 60])
+
+    assert status == 413
+    assert received == []
+    assert app.budget._in_flight == 0
+
+
+@pytest.mark.anyio
+async def test_exhausted_budget_returns_503_and_releases_reserved_chunks() -> None:
+    app, received = create_app(UploadsSchema(max_size=100, inflight_budget=50, budget_wait=0.01, retry_after=7))
+    # Место в бюджете занято другим запросом
+    await app.budget.acquire(30, timeout=0)
+
+    status, headers = await post(app, [b"a" * 10, b"b" * 20])
+
+    assert status == 503
+    assert headers["retry-after"] == "7"
+    assert received == []
+    # Первый чанк запроса был зарезервирован и возвращён, чужой резерв не тронут
+    assert app.budget._in_flight == 30
+
+
+@pytest.mark.anyio
+async def test_upload_waits_for_budget_within_budget_wait() -> None:
+    app, received = create_app(UploadsSchema(max_size=100, inflight_budget=50, budget_wait=1))
+    await app.budget.acquire(40, timeout=0)
+
+    async def release_later() -> None:
+        await asyncio.sleep(0.01)
+        await app.budget.release(40)
+
+    (status, _), _ = await asyncio.gather(post(app, [b"a" * 20]), release_later())
+
+    assert status == 200
+    assert received == [20]
+    assert app.budget._in_flight == 0
+
+
+@pytest.mark.anyio
+async def test_non_multipart_requests_are_not_limited() -> None:
+    app, received = create_app(UploadsSchema(max_size=10, inflight_budget=10))
+
+    status, _ = await post(app, [b"a" * 50], content_type="application/json", content_length=50)
+
+    assert status == 200
+    assert received == [50]